@@ -3,18 +3,255 @@ pragma solidity ^0.8.0;
 
 import '../interfaces/IERC20.sol';
 import '../interfaces/IExchange.sol';
+import '../interfaces/IERC20Permit.sol';
 
 contract RUExchange is IExchange {
 
+    /**
+     * Pool reserves and the (truncated) timestamp of their last update, packed into one storage slot.
+     * Every function that changes the pool balances must end with a call to `_update` with the new balances.
+     */
+    uint112 private reserveToken;
+    uint112 private reserveETH;
+    uint32 private blockTimestampLast;
+
+    /**
+     * Cumulative ETH-per-token and tokens-per-ETH prices (seconds times UQ112x112), as of `blockTimestampLast`.
+     */
+    uint private tokenPriceCumulativeLast;
+    uint private ethPriceCumulativeLast;
+
+    /**
+     * Fee percentage of each trade (set by `initialize`) and total supply of liquidity tokens.
+     */
+    uint8 private feePercent;
+    uint private totalLiquidity;
+
+    /**
+     * The traded token (set by `initialize`).
+     */
+    IERC20 private RUXtoken;
+
+    /**
+     * Liquidity token balances and allowances.
+     */
+    mapping(address => uint) private balances;
+    mapping(address => mapping(address => uint)) private allowances;
+
+    /**
+     * The account that deployed the exchange, the only one allowed to initialize it.
+     */
+    address private immutable deployer;
+
+    constructor() {
+        deployer = msg.sender;
+    }
+
+    /**
+     * @dev Initializes the pool with `initialTOK` tokens and `initialETH` ETH (see {IExchange-initialize}).
+     * Only the deployer may initialize the pool. The caller receives `initialTOK` liquidity tokens; any ETH sent above
+     * `initialETH` is returned.
+     */
     function initialize(IERC20 _RUXtoken, uint8 _feePercent, uint initialTOK, uint initialETH) override public payable returns(uint) {
-        // TODO: Implement
+        require(msg.sender == deployer, "only the deployer can initialize the exchange");
+        require(address(RUXtoken) == address(0), "exchange is already initialized");
+        require(address(_RUXtoken) != address(0), "token can't be the zero address");
+        require(_feePercent < 100, "fee must be below 100 percent");
+        require(initialTOK > 0 && initialETH > 0, "initial liquidity can't be zero");
+        require(msg.value >= initialETH, "msg value is below initialETH");
+        RUXtoken = _RUXtoken;
+        feePercent = _feePercent;
+        mintLiquidity(msg.sender, initialTOK);
+        _update(initialTOK, initialETH);
+        emit LiquidityMinted(msg.sender, initialTOK, initialTOK, initialETH, initialTOK, initialETH, initialTOK);
+        require(_RUXtoken.transferFrom(msg.sender, address(this), initialTOK), "token transfer failed");
+        sendETH(msg.sender, msg.value - initialETH);
+        return initialTOK;
+    }
+
+    /**
+     * @dev {initialize} with an EIP-2612 permit for the initial tokens instead of a prior `approve` (see {IExchange-initializeWithPermit}).
+     */
+    function initializeWithPermit(IERC20 _RUXtoken, uint8 _feePercent, uint initialTOK, uint initialETH, uint deadline, Signature calldata permitSig) override external payable returns(uint) {
+        usePermit(_RUXtoken, initialTOK, deadline, permitSig);
+        return initialize(_RUXtoken, _feePercent, initialTOK, initialETH);
+    }
+
+    /**
+     * @dev {sellTokens} with an EIP-2612 permit for the sold tokens (see {IExchange-sellTokensWithPermit}).
+     */
+    function sellTokensWithPermit(uint amount, uint minPrice, uint deadline, Signature calldata permitSig) override external returns (uint, uint, uint) {
+        usePermit(RUXtoken, amount, deadline, permitSig);
+        return sellTokens(amount, minPrice);
+    }
+
+    /**
+     * @dev {mintLiquidityTokens} with an EIP-2612 permit for up to `maxTOK` tokens (see {IExchange-mintLiquidityTokensWithPermit}).
+     */
+    function mintLiquidityTokensWithPermit(uint amount, uint maxTOK, uint maxETH, uint deadline, Signature calldata permitSig) override external payable returns (uint, uint) {
+        usePermit(RUXtoken, maxTOK, deadline, permitSig);
+        return mintLiquidityTokens(amount, maxTOK, maxETH);
+    }
+
+    /**
+     * Approves this exchange to spend `value` of the caller's tokens with a permit signature. A failing permit is ignored:
+     * if it was already submitted by someone else (front-running it), the allowance it set is still there, and if the
+     * allowance is missing the token transfer that follows reverts anyway.
+     * A call to an address without code (e.g. `RUXtoken` before initialization) would revert outside the `try`, so it is
+     * skipped, and the call that follows reverts with its own reason.
+     */
+    function usePermit(IERC20 token, uint value, uint deadline, Signature calldata permitSig) private {
+        if (address(token).code.length == 0) {
+            return;
+        }
+        try IERC20Permit(address(token)).permit(msg.sender, address(this), value, deadline, permitSig.v, permitSig.r, permitSig.s) {
+        } catch {
+        }
     }
 
     /**
      * Returns the current number of tokens in the liquidity pool.
      */
     function tokenBalance() external view returns(uint) {
-        // TODO: Implement
+        return reserveToken;
+    }
+
+    /**
+     * @dev Returns the pool reserves and the timestamp of their last update (see {IExchange-getReserves}).
+     */
+    function getReserves() external view override returns (uint112, uint112, uint32) {
+        return (reserveToken, reserveETH, blockTimestampLast);
+    }
+
+    /**
+     * @dev Returns the cumulative prices as of the current block (see {IExchange-observe}).
+     * If the reserves were not updated in this block, the time since the last update is accumulated here
+     * at the stored reserves, exactly as the next `_update` will.
+     */
+    function observe() external view override returns (uint tokenPriceCumulative, uint ethPriceCumulative, uint32 blockTimestamp) {
+        blockTimestamp = uint32(block.timestamp % 2**32);
+        tokenPriceCumulative = tokenPriceCumulativeLast;
+        ethPriceCumulative = ethPriceCumulativeLast;
+        (uint112 _reserveToken, uint112 _reserveETH, uint32 _blockTimestampLast) = (reserveToken, reserveETH, blockTimestampLast);
+        unchecked {
+            uint32 timeElapsed = blockTimestamp - _blockTimestampLast; // Wraps around as intended
+            (uint tokenPriceIncrement, uint ethPriceIncrement) = priceIncrements(_reserveToken, _reserveETH, timeElapsed);
+            tokenPriceCumulative += tokenPriceIncrement;
+            ethPriceCumulative += ethPriceIncrement;
+        }
+    }
+
+    /**
+     * @dev Returns the result of buying `amount` tokens at the current reserves (see {IExchange-quoteBuyTokens}).
+     */
+    function quoteBuyTokens(uint amount) external view override returns (uint, uint, uint) {
+        return buyQuote(reserveToken, reserveETH, feePercent, amount);
+    }
+
+    /**
+     * @dev Returns the result of selling `amount` tokens at the current reserves (see {IExchange-quoteSellTokens}).
+     */
+    function quoteSellTokens(uint amount) external view override returns (uint, uint, uint) {
+        return sellQuote(reserveToken, reserveETH, feePercent, amount);
+    }
+
+    /**
+     * @dev Returns the deposit needed to mint `amount` liquidity tokens (see {IExchange-quoteMintLiquidityTokens}).
+     */
+    function quoteMintLiquidityTokens(uint amount) external view override returns (uint, uint) {
+        return mintQuote(reserveToken, reserveETH, totalLiquidity, amount);
+    }
+
+    /**
+     * @dev Returns the withdrawal for burning `amount` liquidity tokens (see {IExchange-quoteBurnLiquidityTokens}).
+     */
+    function quoteBurnLiquidityTokens(uint amount) external view override returns (uint, uint) {
+        return burnQuote(reserveToken, reserveETH, totalLiquidity, amount);
+    }
+
+    function ceilDiv(uint a, uint b) private pure returns (uint) {
+        return a == 0 ? 0 : (a - 1) / b + 1;
+    }
+
+    /**
+     * Fee (rounded up) of `fee` percent of `value`.
+     */
+    function feeOf(uint value, uint fee) private pure returns (uint) {
+        return ceilDiv(value * fee, 100);
+    }
+
+    /**
+     * Pricing of {buyTokens}: the ETH that must reach the pool to keep the reserve product constant (rounded up),
+     * grossed up so that it remains after the (rounded up) ETH fee; the token fee is taken from `amount`.
+     * The same arithmetic as `quote_buy` in scripts/amm.py.
+     */
+    function buyQuote(uint tokenReserve, uint ethReserve, uint fee, uint amount) internal pure returns (uint price, uint ethFee, uint tokenFee) {
+        require(amount < tokenReserve, "can't buy more tokens than the pool holds");
+        uint ethIn = ceilDiv(tokenReserve * ethReserve, tokenReserve - amount) - ethReserve;
+        price = ceilDiv(ethIn * 100, 100 - fee);
+        ethFee = price - ethIn;
+        tokenFee = feeOf(amount, fee);
+    }
+
+    /**
+     * Pricing of {sellTokens}: the token fee is taken from `amount` before the trade, and the ETH fee from the
+     * proceeds (the pool keeps the reserve product, rounding in its favor). Same as `quote_sell` in scripts/amm.py.
+     */
+    function sellQuote(uint tokenReserve, uint ethReserve, uint fee, uint amount) internal pure returns (uint value, uint ethFee, uint tokenFee) {
+        require(tokenReserve > 0, "exchange is not initialized");
+        tokenFee = feeOf(amount, fee);
+        uint ethOut = ethReserve - ceilDiv(tokenReserve * ethReserve, tokenReserve + amount - tokenFee);
+        ethFee = feeOf(ethOut, fee);
+        value = ethOut - ethFee;
+    }
+
+    /**
+     * Deposit for minting `amount` liquidity tokens, proportional to the reserves and rounded up.
+     */
+    function mintQuote(uint tokenReserve, uint ethReserve, uint _totalLiquidity, uint amount) internal pure returns (uint tokens, uint eth) {
+        require(_totalLiquidity > 0, "exchange is not initialized");
+        return (ceilDiv(amount * tokenReserve, _totalLiquidity), ceilDiv(amount * ethReserve, _totalLiquidity));
+    }
+
+    /**
+     * Withdrawal for burning `amount` liquidity tokens, proportional to the reserves and rounded down.
+     */
+    function burnQuote(uint tokenReserve, uint ethReserve, uint _totalLiquidity, uint amount) internal pure returns (uint tokens, uint eth) {
+        require(_totalLiquidity > 0, "exchange is not initialized");
+        require(amount <= _totalLiquidity, "can't burn more than the total liquidity");
+        return (amount * tokenReserve / _totalLiquidity, amount * ethReserve / _totalLiquidity);
+    }
+
+    /**
+     * Increments of the cumulative prices for `timeElapsed` seconds at the given reserves (zero while the pool is empty).
+     */
+    function priceIncrements(uint112 _reserveToken, uint112 _reserveETH, uint32 timeElapsed) private pure returns (uint, uint) {
+        if (timeElapsed == 0 || _reserveToken == 0 || _reserveETH == 0) {
+            return (0, 0);
+        }
+        unchecked { // Each price is below 2**224, times at most 2**32 seconds
+            return (((uint(_reserveETH) << 112) / _reserveToken) * timeElapsed, ((uint(_reserveToken) << 112) / _reserveETH) * timeElapsed);
+        }
+    }
+
+    /**
+     * Stores the new pool balances, after accumulating the prices at the previous reserves for the time since the last update.
+     * The accumulators use the reserves from *before* the current block's first trade, so the prices can only be moved
+     * by trades that stay in the pool across blocks.
+     */
+    function _update(uint newTokenReserve, uint newETHReserve) private {
+        require(newTokenReserve <= type(uint112).max && newETHReserve <= type(uint112).max, "reserve overflow");
+        uint32 blockTimestamp = uint32(block.timestamp % 2**32);
+        (uint112 _reserveToken, uint112 _reserveETH, uint32 _blockTimestampLast) = (reserveToken, reserveETH, blockTimestampLast);
+        unchecked {
+            uint32 timeElapsed = blockTimestamp - _blockTimestampLast; // Wraps around as intended
+            if (timeElapsed > 0) {
+                (uint tokenPriceIncrement, uint ethPriceIncrement) = priceIncrements(_reserveToken, _reserveETH, timeElapsed);
+                tokenPriceCumulativeLast += tokenPriceIncrement; // Wraps around as intended
+                ethPriceCumulativeLast += ethPriceIncrement;
+            }
+        }
+        (reserveToken, reserveETH, blockTimestampLast) = (uint112(newTokenReserve), uint112(newETHReserve), blockTimestamp);
     }
 
 
@@ -24,9 +261,20 @@ contract RUExchange is IExchange {
      * Note that the fee is taken in *both* tokens and ETH. The fee percentage is taken from `amount` tokens 
      * (rounded up) *after* they are bought, and taken from the ETH sent (rounded up) *before* the purchase.
      * @return Returns the actual total cost in ETH including fee.
+     *
+     * Emits a {TokensBought} event.
      */
-    function buyTokens(uint amount, uint maxPrice) override public payable returns (uint,uint,uint) {
-        // TODO: Implement
+    function buyTokens(uint amount, uint maxPrice) override public payable returns (uint price, uint ethFee, uint tokenFee) {
+        (uint tokenReserve, uint ethReserve) = (reserveToken, reserveETH);
+        (price, ethFee, tokenFee) = buyQuote(tokenReserve, ethReserve, feePercent, amount);
+        require(price <= maxPrice, "price is above maxPrice");
+        require(msg.value >= price, "msg value is below the price");
+        tokenReserve -= amount - tokenFee;
+        ethReserve += price;
+        _update(tokenReserve, ethReserve);
+        emit TokensBought(msg.sender, amount, price, ethFee, tokenFee, tokenReserve, ethReserve);
+        require(RUXtoken.transfer(msg.sender, amount - tokenFee), "token transfer failed");
+        sendETH(msg.sender, msg.value - price);
     }
 
     /**
@@ -35,9 +283,146 @@ contract RUExchange is IExchange {
      * Note that the fee is taken in *both* tokens and ETH. The fee percentage is taken from `amount` tokens 
      * (rounded up) *before* selling, and taken from the ETH returned (rounded up) *after* selling.
      * @return Returns a tuple with the actual total value in ETH minus the fee, the eth fee and the token fee.
+     *
+     * Emits a {TokensSold} event.
+     */
+    function sellTokens(uint amount, uint minPrice) override public returns (uint value, uint ethFee, uint tokenFee) {
+        (uint tokenReserve, uint ethReserve) = (reserveToken, reserveETH);
+        (value, ethFee, tokenFee) = sellQuote(tokenReserve, ethReserve, feePercent, amount);
+        require(value >= minPrice, "value is below minPrice");
+        tokenReserve += amount;
+        ethReserve -= value;
+        _update(tokenReserve, ethReserve);
+        emit TokensSold(msg.sender, amount, value, ethFee, tokenFee, tokenReserve, ethReserve);
+        require(RUXtoken.transferFrom(msg.sender, address(this), amount), "token transfer failed");
+        sendETH(msg.sender, value);
+    }
+
+    /**
+     * @dev Settles buy and sell orders at a single clearing price, trading only their net imbalance against the pool
+     * (see {IExchange-settleBatch} for the pricing). The clearing price is given by `batchClearingPrice`.
+     * All limits are checked and the reserves are stored before anything is paid out.
+     * @return Returns the total ETH paid for the buy orders and the total ETH paid out for the sell orders.
+     *
+     * Emits a {BatchSettled} event.
+     */
+    function settleBatch(Order[] calldata buys, Order[] calldata sells) override public payable returns (uint ethPaid, uint ethReceived) {
+        uint fee = feePercent;
+        (uint numerator, uint denominator) = batchPrice(buys, sells, fee);
+        uint tokensOut;
+        (ethPaid, tokensOut) = batchBuyTotals(buys, fee, numerator, denominator);
+        ethReceived = batchSellTotal(sells, fee, numerator, denominator);
+        require(msg.value >= ethPaid, "msg value is below the total price of the buys");
+        uint tokensSold = sumAmounts(sells);
+        recordBatch(sumAmounts(buys), tokensSold, tokensOut, ethPaid, ethReceived);
+        if (tokensSold > 0) {
+            require(RUXtoken.transferFrom(msg.sender, address(this), tokensSold), "token transfer failed");
+        }
+        payBatch(buys, sells, fee, numerator, denominator);
+        sendETH(msg.sender, msg.value - ethPaid);
+    }
+
+    /**
+     * Clearing price of a batch at the current reserves (see `batchClearingPrice`).
+     */
+    function batchPrice(Order[] calldata buys, Order[] calldata sells, uint fee) private view returns (uint numerator, uint denominator) {
+        require(reserveToken > 0, "exchange is not initialized");
+        uint tokensSold = 0; // After the sell token fees
+        for (uint i = 0; i < sells.length; i++) {
+            tokensSold += sells[i].amount - feeOf(sells[i].amount, fee);
+        }
+        return batchClearingPrice(reserveToken, reserveETH, sumAmounts(buys), tokensSold);
+    }
+
+    /**
+     * Checks the limit and recipient of every buy at the clearing price. Returns the total price of the buys and the
+     * tokens delivered to the buyers (after their token fees).
+     */
+    function batchBuyTotals(Order[] calldata buys, uint fee, uint numerator, uint denominator) private pure returns (uint ethPaid, uint tokensOut) {
+        for (uint i = 0; i < buys.length; i++) {
+            Order calldata order = buys[i];
+            require(order.recipient != address(0), "recipient can't be the zero address");
+            (uint price, uint tokenFee) = batchBuyQuote(order.amount, fee, numerator, denominator);
+            require(price <= order.limit, "buy price is above its limit");
+            ethPaid += price;
+            tokensOut += order.amount - tokenFee;
+        }
+    }
+
+    /**
+     * Checks the limit and recipient of every sell at the clearing price. Returns the total value of the sells.
+     */
+    function batchSellTotal(Order[] calldata sells, uint fee, uint numerator, uint denominator) private pure returns (uint ethReceived) {
+        for (uint i = 0; i < sells.length; i++) {
+            Order calldata order = sells[i];
+            require(order.recipient != address(0), "recipient can't be the zero address");
+            uint value = batchSellQuote(order.amount, fee, numerator, denominator);
+            require(value >= order.limit, "sell value is below its limit");
+            ethReceived += value;
+        }
+    }
+
+    /**
+     * Stores the reserves after a batch with the given totals.
+     *
+     * Emits a {BatchSettled} event.
+     */
+    function recordBatch(uint tokensBought, uint tokensSold, uint tokensOut, uint ethPaid, uint ethReceived) private {
+        uint tokenReserve = reserveToken + tokensSold - tokensOut;
+        uint ethReserve = reserveETH + ethPaid - ethReceived;
+        _update(tokenReserve, ethReserve);
+        emit BatchSettled(msg.sender, tokensBought, tokensSold, ethPaid, ethReceived, tokenReserve, ethReserve);
+    }
+
+    /**
+     * Pays out the tokens of the buys and the ETH of the sells, recomputing each order's share as the totals above did.
+     */
+    function payBatch(Order[] calldata buys, Order[] calldata sells, uint fee, uint numerator, uint denominator) private {
+        for (uint i = 0; i < buys.length; i++) {
+            require(RUXtoken.transfer(buys[i].recipient, buys[i].amount - feeOf(buys[i].amount, fee)), "token transfer failed");
+        }
+        for (uint i = 0; i < sells.length; i++) {
+            sendETH(sells[i].recipient, batchSellQuote(sells[i].amount, fee, numerator, denominator));
+        }
+    }
+
+    /**
+     * Price (including the ETH fee) and token fee of a buy of `amount` tokens at the clearing price `numerator / denominator`.
+     */
+    function batchBuyQuote(uint amount, uint fee, uint numerator, uint denominator) private pure returns (uint price, uint tokenFee) {
+        uint ethIn = ceilDiv(amount * numerator, denominator);
+        price = ceilDiv(ethIn * 100, 100 - fee);
+        tokenFee = feeOf(amount, fee);
+    }
+
+    /**
+     * Value (after the fees) of a sell of `amount` tokens at the clearing price `numerator / denominator`.
+     */
+    function batchSellQuote(uint amount, uint fee, uint numerator, uint denominator) private pure returns (uint value) {
+        uint ethOut = (amount - feeOf(amount, fee)) * numerator / denominator;
+        value = ethOut - feeOf(ethOut, fee);
+    }
+
+    function sumAmounts(Order[] calldata orders) private pure returns (uint total) {
+        for (uint i = 0; i < orders.length; i++) {
+            total += orders[i].amount;
+        }
+    }
+
+    /**
+     * Clearing price of a batch, as the fraction `numerator / denominator` ETH per token, for `tokensBought` tokens bought
+     * and `tokensSold` tokens sold (after the sell token fees). Same as `quote_batch` in scripts/amm.py.
      */
-    function sellTokens(uint amount, uint minPrice) override public returns (uint, uint, uint) {
-        // TODO: Implement
+    function batchClearingPrice(uint tokenReserve, uint ethReserve, uint tokensBought, uint tokensSold) internal pure returns (uint numerator, uint denominator) {
+        if (tokensBought > tokensSold) {
+            uint net = tokensBought - tokensSold;
+            require(net < tokenReserve, "can't buy more tokens than the pool holds");
+            return (ceilDiv(tokenReserve * ethReserve, tokenReserve - net) - ethReserve, net);
+        } else if (tokensBought < tokensSold) {
+            uint net = tokensSold - tokensBought;
+            return (ethReserve - ceilDiv(tokenReserve * ethReserve, tokenReserve + net), net);
+        }
+        return (ethReserve, tokenReserve);
     }
 
     /**
@@ -46,32 +431,92 @@ contract RUExchange is IExchange {
      * and the msg value at least `maxETH`.
      * Unused funds will be returned to the sender.
      * @return returns a tuple consisting of (token_spent, eth_spent). 
+     *
+     * Emits a {LiquidityMinted} event.
      */
-    function mintLiquidityTokens(uint amount, uint maxTOK, uint maxETH) public payable returns (uint,uint) {
-        // TODO: Implement
+    function mintLiquidityTokens(uint amount, uint maxTOK, uint maxETH) public payable returns (uint tokens, uint eth) {
+        (uint tokenReserve, uint ethReserve) = (reserveToken, reserveETH);
+        (tokens, eth) = mintQuote(tokenReserve, ethReserve, totalLiquidity, amount);
+        require(tokens <= maxTOK, "token deposit is above maxTOK");
+        require(eth <= maxETH, "ETH deposit is above maxETH");
+        require(msg.value >= eth, "msg value is below the ETH deposit");
+        tokenReserve += tokens;
+        ethReserve += eth;
+        _update(tokenReserve, ethReserve);
+        mintLiquidity(msg.sender, amount);
+        emit LiquidityMinted(msg.sender, amount, tokens, eth, tokenReserve, ethReserve, totalLiquidity);
+        require(RUXtoken.transferFrom(msg.sender, address(this), tokens), "token transfer failed");
+        sendETH(msg.sender, msg.value - eth);
     }
 
     /**
      * @dev burn `amount` liquidity tokens, as long as this will result in at least minTOK tokens and at least minETH eth being generated.
      * The resulting tokens and ETH will be credited to the sender.
      * @return Returns a tuple consisting of (token_credited, eth_credited). 
+     *
+     * Emits a {LiquidityBurned} event.
      */
-    function burnLiquidityTokens(uint amount, uint minTOK, uint minETH) override public payable returns (uint,uint) {
-        // TODO: Implement
+    function burnLiquidityTokens(uint amount, uint minTOK, uint minETH) override public payable returns (uint tokens, uint eth) {
+        (uint tokenReserve, uint ethReserve) = (reserveToken, reserveETH);
+        (tokens, eth) = burnQuote(tokenReserve, ethReserve, totalLiquidity, amount);
+        require(tokens >= minTOK, "token withdrawal is below minTOK");
+        require(eth >= minETH, "ETH withdrawal is below minETH");
+        burnLiquidity(msg.sender, amount);
+        tokenReserve -= tokens;
+        ethReserve -= eth;
+        _update(tokenReserve, ethReserve);
+        emit LiquidityBurned(msg.sender, amount, tokens, eth, tokenReserve, ethReserve, totalLiquidity);
+        require(RUXtoken.transfer(msg.sender, tokens), "token transfer failed");
+        sendETH(msg.sender, eth + msg.value); // The call is payable, but burning takes no ETH: any msg value is returned
+    }
+
+    /**
+     * Creates `amount` liquidity tokens for `account`.
+     *
+     * Emits a {Transfer} event from the zero address.
+     */
+    function mintLiquidity(address account, uint amount) private {
+        totalLiquidity += amount;
+        unchecked { balances[account] += amount; } // Can't overflow: totalLiquidity (checked above) is at least any balance
+        emit Transfer(address(0), account, amount);
+    }
+
+    /**
+     * Destroys `amount` of `account`'s liquidity tokens.
+     *
+     * Emits a {Transfer} event to the zero address.
+     */
+    function burnLiquidity(address account, uint amount) private {
+        uint accountBalance = balances[account];
+        require(accountBalance >= amount, "burn amount exceeds balance");
+        unchecked { // Can't underflow: checked above, and totalLiquidity is at least any balance
+            balances[account] = accountBalance - amount;
+            totalLiquidity -= amount;
+        }
+        emit Transfer(account, address(0), amount);
+    }
+
+    /**
+     * Sends `value` wei to `recipient`, if there is anything to send. State must be updated before calling this.
+     */
+    function sendETH(address recipient, uint value) private {
+        if (value > 0) {
+            payable(recipient).transfer(value);
+        }
     }
 
     /**
      * @dev Returns the amount of tokens in existence.
      */
     function totalSupply() external view returns (uint256) {
-        // TODO: Implement
+        return totalLiquidity;
     }
 
     /**
      * @dev Returns the amount of tokens owned by `account`.
      */
     function balanceOf(address account) public view override returns (uint256) {
-        // TODO: Implement
+        return balances[account];
     }
 
 
@@ -83,7 +528,8 @@ contract RUExchange is IExchange {
      * Emits a {Transfer} event.
      */
     function transfer(address recipient, uint256 amount) external override returns (bool) {
-        // TODO: Implement
+        moveLiquidity(msg.sender, recipient, amount);
+        return true;
     }
 
     /**
@@ -94,7 +540,7 @@ contract RUExchange is IExchange {
      * This value changes when {approve} or {transferFrom} are called.
      */
     function allowance(address owner, address spender) external view override returns (uint256) {
-        // TODO: Implement
+        return allowances[owner][spender];
     }
 
     /**
@@ -112,19 +558,42 @@ contract RUExchange is IExchange {
      * Emits an {Approval} event.
      */
     function approve(address spender, uint256 amount) external override returns (bool) {
-        // TODO: Implement
+        allowances[msg.sender][spender] = amount;
+        emit Approval(msg.sender, spender, amount);
+        return true;
     }
 
     /**
      * @dev Moves `amount` tokens from `sender` to `recipient` using the
      * allowance mechanism. `amount` is then deducted from the caller's
-     * allowance.
+     * allowance, unless the allowance is `type(uint256).max`, which is
+     * treated as infinite and never decreases.
      *
      * Returns a boolean value indicating whether the operation succeeded.
      *
      * Emits a {Transfer} event.
      */
     function transferFrom(address sender, address recipient, uint256 amount) external override returns (bool) {
-        // TODO: Implement
+        uint256 currentAllowance = allowances[sender][msg.sender];
+        if (currentAllowance != type(uint256).max) {
+            require(currentAllowance >= amount, "amount exceeds allowance");
+            unchecked { allowances[sender][msg.sender] = currentAllowance - amount; } // Can't underflow: checked above
+        }
+        moveLiquidity(sender, recipient, amount);
+        return true;
+    }
+
+    /**
+     * Moves `amount` liquidity tokens from `sender` to `recipient`.
+     *
+     * Emits a {Transfer} event.
+     */
+    function moveLiquidity(address sender, address recipient, uint256 amount) private {
+        require(recipient != address(0), "recipient can't be the zero address");
+        uint256 senderBalance = balances[sender];
+        require(senderBalance >= amount, "transfer amount exceeds balance");
+        unchecked { balances[sender] = senderBalance - amount; } // Can't underflow: checked above
+        balances[recipient] += amount;
+        emit Transfer(sender, recipient, amount);
     }
 }
\ No newline at end of file
@@ -3,12 +3,13 @@ pragma solidity ^0.8.0;
 
 import "../interfaces/IERC20.sol";
 import "../interfaces/IMultisigToken.sol";
+import "../interfaces/IERC20Permit.sol";
 
 
 /**
  * @dev An implementation of the ERC20 standard for a "Reichman University" Token.
  */
-contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
+contract RUToken is IERC20, IERC20Metadata, IMultisigToken, IERC20Permit {
     /**
      * Maximum number of mintable tokens.
      */
@@ -28,17 +29,39 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
     mapping(address => uint) public balances;
     mapping(address => mapping(address => uint256)) public allowances;
 
+    /**
+     * Registered multisig keys, packed into three storage slots: `pk1` shares its slot with `nonce`.
+     */
     struct multisig_addresses {
-        uint nonce;
-        address [] pks_list;
+        address pk1;
+        uint96 nonce;
+        address pk2;
+        address pk3;
     }
     mapping(address => multisig_addresses) multiAdd;
 
+    /**
+     * Unordered multisig nonces (see {transfer2of3Unordered}): multisig address => word position => bitmap of used nonces.
+     */
+    mapping(address => mapping(uint256 => uint256)) private unorderedNonces;
+
+    /**
+     * EIP-2612 permit state: the per-owner permit nonces (separate from the multisig `nonce`), and the EIP-712 domain
+     * separator, cached for the chain the token was deployed on and recomputed if the chain id changes (after a fork).
+     */
+    mapping(address => uint256) private permitNonces;
+    bytes32 private constant PERMIT_TYPEHASH = keccak256("Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)");
+    bytes32 private constant DOMAIN_TYPEHASH = keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)");
+    bytes32 private immutable cachedDomainSeparator;
+    uint256 private immutable cachedChainId;
+
 
     constructor(uint _tokenPrice, uint _maxTokens) {
         tokenPrice = _tokenPrice;
         maxTokens = _maxTokens;
         totalAmount = 0;
+        cachedChainId = block.chainid;
+        cachedDomainSeparator = buildDomainSeparator();
     }
 
     /**
@@ -82,6 +105,42 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
     }
 
 
+    /**
+     * @dev Returns the amount of tokens owned by each of `accounts`, in the same order.
+     * Unlike {balanceOf}, it doesn't reject the zero address, whose balance is always 0 (burned tokens aren't credited to it).
+     */
+    function balanceOfBatch(address[] calldata accounts) external view returns (uint256[] memory) {
+        uint256[] memory result = new uint256[](accounts.length);
+        for (uint i = 0; i < accounts.length; i++) {
+            result[i] = balances[accounts[i]];
+        }
+        return result;
+    }
+
+    /**
+     * @dev Returns `allowances[owners[i]][spenders[i]]` for each i.
+     */
+    function allowanceBatch(address[] calldata owners, address[] calldata spenders) external view returns (uint256[] memory) {
+        require(owners.length == spenders.length, "owners and spenders must have the same length");
+        uint256[] memory result = new uint256[](owners.length);
+        for (uint i = 0; i < owners.length; i++) {
+            result[i] = allowances[owners[i]][spenders[i]];
+        }
+        return result;
+    }
+
+    /**
+     * @dev Returns the nonce of each of `multisigs`, in the same order.
+     */
+    function nonceBatch(address[] calldata multisigs) external view returns (uint256[] memory) {
+        uint256[] memory result = new uint256[](multisigs.length);
+        for (uint i = 0; i < multisigs.length; i++) {
+            result[i] = multiAdd[multisigs[i]].nonce;
+        }
+        return result;
+    }
+
+
     /**
      * @dev Moves `amount` tokens from the caller's account to `recipient`.
      *
@@ -91,9 +150,10 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
      */
     function transfer(address recipient, uint256 amount) external override returns (bool) {
         // TODO: Implement
-        require(balances[msg.sender] >= amount);
+        uint256 senderBalance = balances[msg.sender];
+        require(senderBalance >= amount);
         require(recipient != address(0), "recipient can't be the zero address");
-        balances[msg.sender] -= amount;
+        unchecked { balances[msg.sender] = senderBalance - amount; } // Can't underflow: checked above
         balances[recipient] += amount;
         emit Transfer(msg.sender, recipient, amount);
         return true;
@@ -128,10 +188,7 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
      */
     function approve(address spender, uint256 amount) external override returns (bool) {
         // TODO: Implement
-        address owner = msg.sender;
-        allowances[owner][spender] = 0;
-        require(allowances[owner][spender] == 0);
-        allowances[owner][spender] = amount;
+        allowances[msg.sender][spender] = amount;
         emit Approval(msg.sender, spender, amount);
         return true;
     }
@@ -139,7 +196,8 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
     /**
      * @dev Moves `amount` tokens from `sender` to `recipient` using the
      * allowance mechanism. `amount` is then deducted from the caller's
-     * allowance.
+     * allowance, unless the allowance is `type(uint256).max`, which is
+     * treated as infinite and never decreases.
      *
      * Returns a boolean value indicating whether the operation succeeded.
      *
@@ -147,20 +205,126 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
      */
     function transferFrom(address sender, address recipient, uint256 amount) external override returns (bool) {
         // TODO: Implement
-        address owner = sender;
-        require(balances[sender] >= amount, "check sender has enough to send amount");
-        require(allowances[sender][msg.sender] >= amount);
+        uint256 senderBalance = balances[sender];
+        require(senderBalance >= amount, "check sender has enough to send amount");
         require(recipient != address(0), "check not sending to zero address");
-        balances[sender] -= amount;
+        spendAllowance(sender, amount);
+        unchecked { balances[sender] = senderBalance - amount; } // Can't underflow: checked above
         balances[recipient] += amount;
-        allowances[sender][msg.sender] -= amount;
         emit Transfer(sender, recipient, amount);
         return true;
     }
 
+    /**
+     * Deducts `amount` from the caller's allowance over `owner`'s tokens; an infinite (`type(uint256).max`)
+     * allowance is left untouched, which saves its storage write.
+     */
+    function spendAllowance(address owner, uint256 amount) private {
+        uint256 currentAllowance = allowances[owner][msg.sender];
+        if (currentAllowance != type(uint256).max) {
+            require(currentAllowance >= amount, "amount exceeds allowance");
+            unchecked { allowances[owner][msg.sender] = currentAllowance - amount; } // Can't underflow: checked above
+        }
+    }
+
+    /**
+     * @dev Moves `amounts[i]` tokens from the caller's account to `recipients[i]`, for each i.
+     * The caller's balance is checked and debited once, for the total amount.
+     * The whole batch reverts if any of the transfers is invalid.
+     *
+     * Emits a {Transfer} event for each recipient.
+     */
+    function batchTransfer(address[] calldata recipients, uint256[] calldata amounts) external returns (bool) {
+        uint256 total = sumAmounts(recipients, amounts);
+        uint256 senderBalance = balances[msg.sender];
+        require(senderBalance >= total, "check sender has enough to send total amount");
+        unchecked { balances[msg.sender] = senderBalance - total; } // Can't underflow: checked above
+        creditBatch(msg.sender, recipients, amounts);
+        return true;
+    }
+
+    /**
+     * @dev Moves `amounts[i]` tokens from `sender` to `recipients[i]`, for each i, using the allowance mechanism.
+     * The sender's balance and the caller's allowance are checked and debited once, for the total amount
+     * (an infinite allowance is not debited, as in {transferFrom}).
+     * The whole batch reverts if any of the transfers is invalid.
+     *
+     * Emits a {Transfer} event for each recipient.
+     */
+    function batchTransferFrom(address sender, address[] calldata recipients, uint256[] calldata amounts) external returns (bool) {
+        uint256 total = sumAmounts(recipients, amounts);
+        uint256 senderBalance = balances[sender];
+        require(senderBalance >= total, "check sender has enough to send total amount");
+        spendAllowance(sender, total);
+        unchecked { balances[sender] = senderBalance - total; } // Can't underflow: checked above
+        creditBatch(sender, recipients, amounts);
+        return true;
+    }
+
+    /**
+     * Total of `amounts`, after checking it matches `recipients` one to one.
+     */
+    function sumAmounts(address[] calldata recipients, uint256[] calldata amounts) private pure returns (uint256) {
+        require(recipients.length == amounts.length, "recipients and amounts must have the same length");
+        uint256 total = 0;
+        for (uint i = 0; i < amounts.length; i++) {
+            total += amounts[i];
+        }
+        return total;
+    }
+
+    /**
+     * Credits `amounts[i]` to `recipients[i]`; the total must already have been debited from `sender`.
+     */
+    function creditBatch(address sender, address[] calldata recipients, uint256[] calldata amounts) private {
+        for (uint i = 0; i < recipients.length; i++) {
+            require(recipients[i] != address(0), "recipient can't be the zero address");
+            balances[recipients[i]] += amounts[i];
+            emit Transfer(sender, recipients[i], amounts[i]);
+        }
+    }
+
+    /**
+     * @dev Sets `value` as the allowance of `spender` over `owner`'s tokens, given `owner`'s EIP-712 signature
+     * over the arguments and `owner`'s current permit nonce (see {IERC20Permit-permit}).
+     *
+     * Emits an {Approval} event.
+     */
+    function permit(address owner, address spender, uint256 value, uint256 deadline, uint8 v, bytes32 r, bytes32 s) external override {
+        require(block.timestamp <= deadline, "permit expired");
+        require(spender != address(0), "spender can't be the zero address");
+        // Only the lower-half `s` of each signature is accepted: (v, r, n - s) recovers the same signer (EIP-2)
+        require(uint256(s) <= 0x7FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF5D576E7357A4501DDFE92F46681B20A0, "invalid permit signature s value");
+        bytes32 structHash = keccak256(abi.encode(PERMIT_TYPEHASH, owner, spender, value, permitNonces[owner]++, deadline));
+        address signer = ecrecover(keccak256(abi.encodePacked("\x19\x01", DOMAIN_SEPARATOR(), structHash)), v, r, s);
+        require(signer != address(0) && signer == owner, "invalid permit signature");
+        allowances[owner][spender] = value;
+        emit Approval(owner, spender, value);
+    }
+
+    /**
+     * @dev Returns the current permit nonce of `owner` (see {IERC20Permit-nonces}).
+     */
+    function nonces(address owner) external view override returns (uint256) {
+        return permitNonces[owner];
+    }
+
+    /**
+     * @dev Returns the EIP-712 domain separator of the token (see {IERC20Permit-DOMAIN_SEPARATOR}).
+     */
+    function DOMAIN_SEPARATOR() public view override returns (bytes32) {
+        return block.chainid == cachedChainId ? cachedDomainSeparator : buildDomainSeparator();
+    }
+
+    function buildDomainSeparator() private view returns (bytes32) {
+        return keccak256(abi.encode(DOMAIN_TYPEHASH, keccak256(bytes(name())), keccak256("1"), block.chainid, address(this)));
+    }
+
     /**
      * @dev Mint a new token. 
      * The total number of tokens minted is the msg value divided by tokenPrice.
+     *
+     * Emits a {Transfer} event from the zero address.
      */
     function mint() public payable returns (uint) {
         // TODO: Implement
@@ -170,28 +334,24 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
         require((totalAmount + amount) <= maxTokens, "prevent minting more than maxTokens");
         balances[msg.sender] += amount;
         totalAmount += amount;
+        emit Transfer(address(0), msg.sender, amount);
         return amount;
     }
 
     /**
      * Burn `amount` tokens. The corresponding value (`tokenPrice` for each token) is sent to the caller.
+     *
+     * Emits a {Transfer} event to the zero address.
      */
     function burn(uint amount) public {
         // TODO: Implement
-        require((balances[msg.sender] - amount) >= 0);
-        require(msg.sender != address(0));
-        require(amount <= totalAmount, "burn amount must be less than total supply");
-        balances[msg.sender] -= amount;
-        uint amountEthTransfer = 0;
-        if (amount > 0) {
-            amountEthTransfer = (amount)*(tokenPrice);
-            require(amountEthTransfer / amount == tokenPrice);
-        } else {
-            amountEthTransfer = 0;
-        }
-        balances[address(0)] += amount;
-        payable(msg.sender).transfer(amountEthTransfer);
+        uint256 senderBalance = balances[msg.sender];
+        require(senderBalance >= amount, "burn amount exceeds balance");
+        unchecked { balances[msg.sender] = senderBalance - amount; } // Can't underflow: checked above
         totalAmount -= amount;
+        uint amountEthTransfer = amount * tokenPrice; // Checked arithmetic reverts on overflow
+        emit Transfer(msg.sender, address(0), amount);
+        payable(msg.sender).transfer(amountEthTransfer); // State is updated before the external call
     }
 
     /**
@@ -202,8 +362,7 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
         bytes32 new_address = keccak256(abi.encodePacked(pk1, pk2, pk3));
         address multisig_address = address(uint160(uint256(new_address)));
         require(multiAdd[multisig_address].nonce == 0);
-        multiAdd[multisig_address].nonce = 1;
-        multiAdd[multisig_address].pks_list = [pk1,pk2,pk3];
+        multiAdd[multisig_address] = multisig_addresses(pk1, 1, pk2, pk3);
         return multisig_address;
 
     }
@@ -219,11 +378,11 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
     }
 
     function transferFrom_multisig(address sender, address recipient, uint256 amount) private returns (bool) {
-        address owner = sender;
         require(recipient != address(0));
         require(sender != address(0));
-        require(balances[sender] >= amount);
-        balances[sender] -= amount;
+        uint256 senderBalance = balances[sender];
+        require(senderBalance >= amount);
+        unchecked { balances[sender] = senderBalance - amount; } // Can't underflow: checked above
         balances[recipient] += amount;
         emit Transfer(sender, recipient, amount);
         return true;
@@ -243,22 +402,104 @@ contract RUToken is IERC20, IERC20Metadata, IMultisigToken {
      */
     function transfer2of3(address multisigOwner, address recipient, uint256 amount, uint nonce, Signature calldata secondSig) external returns (bool){
         require(multisigOwner != address(0));
-        require(nonce == multiAdd[multisigOwner].nonce + 1);
+        multisig_addresses memory multisig = multiAdd[multisigOwner]; // Three SLOADs for the keys and the nonce
+        require(nonce == multisig.nonce + 1);
         require(recipient != address(0));
         require(amount > 0);
-        address secondSig_address = ecrecover(keccak256(abi.encodePacked(address(this), recipient, multisigOwner, amount, nonce)), secondSig.v, secondSig.r, secondSig.s);
-        require(msg.sender != secondSig_address);
-        require(secondSig_address != address(0));
-        address multisig_address_pk1 = multiAdd[multisigOwner].pks_list[0];
-        address multisig_address_pk2 = multiAdd[multisigOwner].pks_list[1];
-        address multisig_address_pk3 = multiAdd[multisigOwner].pks_list[2];
-        require(multisig_address_pk1 == msg.sender || multisig_address_pk2 == msg.sender || multisig_address_pk3 == msg.sender);
-        require(multisig_address_pk1 == secondSig_address || multisig_address_pk2 == secondSig_address || multisig_address_pk3 == secondSig_address);
-        multiAdd[multisigOwner].nonce += 1;
+        checkSigners(multisig, keccak256(abi.encodePacked(address(this), recipient, multisigOwner, amount, nonce)), secondSig);
+        multiAdd[multisigOwner].nonce = uint96(nonce);
+        require(transferFrom_multisig(multisigOwner, recipient, amount));
+
+        return true;
+
+    }
+
+    /**
+     * @dev Moves `amounts[i]` tokens from the multisig address `multisigOwner` to `recipients[i]`, for each i.
+     *
+     * Same rules as {transfer2of3}, but the whole batch is approved by a single `secondSig` and consumes a single `nonce`.
+     * `secondSig` signs keccak256(abi.encodePacked(address(this), multisigOwner, nonce, keccak256(abi.encodePacked(recipients)), keccak256(abi.encodePacked(amounts)))).
+     * The batch reverts as a whole if any of the transfers is invalid.
+     *
+     * Emits a {Transfer} event for each recipient.
+     */
+    function transfer2of3Batch(address multisigOwner, address[] calldata recipients, uint256[] calldata amounts, uint nonce, Signature calldata secondSig) external returns (bool){
+        require(multisigOwner != address(0));
+        multisig_addresses memory multisig = multiAdd[multisigOwner];
+        require(nonce == multisig.nonce + 1);
+        uint256 total = sumAmounts(recipients, amounts);
+        require(total > 0);
+        // The preimage is 136 bytes long (vs. 124 for transfer2of3), so a signature can't be reused across the two functions.
+        bytes32 message_hash = keccak256(abi.encodePacked(address(this), multisigOwner, nonce, keccak256(abi.encodePacked(recipients)), keccak256(abi.encodePacked(amounts))));
+        checkSigners(multisig, message_hash, secondSig);
+        multiAdd[multisigOwner].nonce = uint96(nonce);
+        uint256 ownerBalance = balances[multisigOwner];
+        require(ownerBalance >= total);
+        unchecked { balances[multisigOwner] = ownerBalance - total; } // Can't underflow: checked above
+        creditBatch(multisigOwner, recipients, amounts);
+
+        return true;
+    }
+
+    /**
+     * @dev Moves `amount` tokens from the multisig address `multisigOwner` to `recipient`, with an unordered nonce
+     * (see {IMultisigToken-transfer2of3Unordered}).
+     *
+     * Emits a {Transfer} event.
+     */
+    function transfer2of3Unordered(address multisigOwner, address recipient, uint256 amount, uint256 nonce, Signature calldata secondSig) external override returns (bool){
+        require(multisigOwner != address(0));
+        require(recipient != address(0));
+        require(amount > 0);
+        bytes32 message_hash = keccak256(abi.encodePacked("transfer2of3Unordered", address(this), recipient, multisigOwner, amount, nonce));
+        checkSigners(multiAdd[multisigOwner], message_hash, secondSig);
+        useUnorderedNonce(multisigOwner, nonce);
         require(transferFrom_multisig(multisigOwner, recipient, amount));
 
         return true;
+    }
+
+    /**
+     * @dev Returns word `wordPos` of the unordered nonce bitmap of `multisigOwner` (see {IMultisigToken-nonceBitmap}).
+     */
+    function nonceBitmap(address multisigOwner, uint256 wordPos) external view override returns (uint256) {
+        return unorderedNonces[multisigOwner][wordPos];
+    }
 
+    /**
+     * @dev Marks the unordered nonces in `mask` of word `wordPos` as used (see {IMultisigToken-invalidateUnorderedNonces}).
+     *
+     * Emits an {UnorderedNonceInvalidation} event.
+     */
+    function invalidateUnorderedNonces(address multisigOwner, uint256 wordPos, uint256 mask) external override {
+        require(multisigOwner != address(0));
+        multisig_addresses memory multisig = multiAdd[multisigOwner];
+        require(multisig.pk1 == msg.sender || multisig.pk2 == msg.sender || multisig.pk3 == msg.sender);
+        unorderedNonces[multisigOwner][wordPos] |= mask;
+        emit UnorderedNonceInvalidation(multisigOwner, wordPos, mask);
+    }
+
+    /**
+     * Marks the unordered `nonce` of `multisigOwner` as used, reverting if it already was.
+     * The high 248 bits of the nonce select a word of the bitmap and the low 8 bits a bit within it,
+     * so up to 256 consecutive nonces share one storage slot.
+     */
+    function useUnorderedNonce(address multisigOwner, uint256 nonce) private {
+        uint256 bit = 1 << (nonce & 0xff);
+        uint256 flipped = unorderedNonces[multisigOwner][nonce >> 8] ^= bit;
+        require(flipped & bit != 0, "nonce already used");
+    }
+
+    /**
+     * Checks that `msg.sender` and the signer of `secondSig` over `message_hash` are two different public keys controlling `multisig`.
+     * For an unregistered multisig address all keys are zero, so the check fails.
+     */
+    function checkSigners(multisig_addresses memory multisig, bytes32 message_hash, Signature calldata secondSig) private view {
+        address secondSig_address = ecrecover(message_hash, secondSig.v, secondSig.r, secondSig.s);
+        require(msg.sender != secondSig_address);
+        require(secondSig_address != address(0));
+        require(multisig.pk1 == msg.sender || multisig.pk2 == msg.sender || multisig.pk3 == msg.sender);
+        require(multisig.pk1 == secondSig_address || multisig.pk2 == secondSig_address || multisig.pk3 == secondSig_address);
     }
 
 
@@ -2,27 +2,117 @@
 pragma solidity ^0.8.0;
 
 import "./IERC20.sol";
+import "./IMultisigToken.sol";
 
 /**
  * @dev Interface of a Uniswap-style exchange.
  */
 interface IExchange is IERC20 {
+    /**
+     * @dev An order in a batch settled by {settleBatch}: `amount` tokens bought (or sold) for `recipient`, who receives
+     * the tokens (or ETH). `limit` is the maximum total price in ETH for a buy, and the minimum value in ETH for a sell.
+     */
+    struct Order {
+        address recipient;
+        uint amount;
+        uint limit;
+    }
+
+    /**
+     * @dev Emitted by {buyTokens}. `price` is the total ETH paid including `ethFee`, and the buyer received `amount - tokenFee` tokens.
+     * `tokenReserve` and `ethReserve` are the pool balances after the trade, including the deposited fees.
+     */
+    event TokensBought(address indexed buyer, uint amount, uint price, uint ethFee, uint tokenFee, uint tokenReserve, uint ethReserve);
+
+    /**
+     * @dev Emitted by {sellTokens}. `value` is the ETH paid to the seller after deducting `ethFee`.
+     * `tokenReserve` and `ethReserve` are the pool balances after the trade, including the deposited fees.
+     */
+    event TokensSold(address indexed seller, uint amount, uint value, uint ethFee, uint tokenFee, uint tokenReserve, uint ethReserve);
+
+    /**
+     * @dev Emitted by {settleBatch}. `tokensBought` and `tokensSold` are the order amounts of each side, `ethPaid` the total
+     * ETH paid for the buy orders and `ethReceived` the total ETH paid out for the sell orders.
+     * `tokenReserve` and `ethReserve` are the pool balances after the settlement, including the deposited fees.
+     */
+    event BatchSettled(address indexed settler, uint tokensBought, uint tokensSold, uint ethPaid, uint ethReceived, uint tokenReserve, uint ethReserve);
+
+    /**
+     * @dev Emitted by {initialize} and {mintLiquidityTokens} when `amount` liquidity tokens are minted for `tokens` tokens and `eth` ETH.
+     * `tokenReserve`, `ethReserve` and `totalLiquidity` are the pool balances and liquidity token supply after minting.
+     */
+    event LiquidityMinted(address indexed provider, uint amount, uint tokens, uint eth, uint tokenReserve, uint ethReserve, uint totalLiquidity);
+
+    /**
+     * @dev Emitted by {burnLiquidityTokens} when `amount` liquidity tokens are burned for `tokens` tokens and `eth` ETH.
+     * `tokenReserve`, `ethReserve` and `totalLiquidity` are the pool balances and liquidity token supply after burning.
+     */
+    event LiquidityBurned(address indexed provider, uint amount, uint tokens, uint eth, uint tokenReserve, uint ethReserve, uint totalLiquidity);
+
     /**
      * @dev initialize the exchange contract and add liquidity.
-     * Initialization may be performed only once. 
+     * Initialization may be performed only once, and only by the account that deployed the exchange.
      * The initial supply of tokens is `initialTOK` (the caller must approve the exchange address to spend this much on their behalf).
      * The initial supply of ETH is `initialETH` (the value sent in the call must be at least this much).
      *
      * The number of liquidity tokens allocated is returned.
+     *
+     * Emits a {LiquidityMinted} event.
      */
     function initialize(IERC20 _RUXtoken, uint8 _feePercent, uint initialTOK, uint initialETH) external payable returns(uint) ;
 
+    /**
+     * @dev Same as {initialize}, but first approves the exchange to spend `initialTOK` of the caller's tokens with
+     * `permitSig`, an EIP-2612 permit signature (see {IERC20Permit-permit}) valid until `deadline`, so no separate
+     * `approve` transaction is needed. `_RUXtoken` must support permits.
+     */
+    function initializeWithPermit(IERC20 _RUXtoken, uint8 _feePercent, uint initialTOK, uint initialETH, uint deadline, Signature calldata permitSig) external payable returns(uint);
+
 
     /**
      * Returns the current number of tokens in the liquidity pool.
      */
     function tokenBalance() external view returns(uint);
 
+    /**
+     * @dev Returns the pool reserves as of the last trade or liquidity change, and the (truncated to 32 bits)
+     * timestamp of the block in which they were last updated. The three values share one storage slot.
+     */
+    function getReserves() external view returns (uint112 tokenReserve, uint112 ethReserve, uint32 blockTimestampLast);
+
+    /**
+     * @dev Returns the cumulative prices as of the current block, and the current (truncated to 32 bits) block timestamp.
+     * `tokenPriceCumulative` is the sum over time of the ETH-per-token price, and `ethPriceCumulative` the sum of the
+     * tokens-per-ETH price, each in seconds times UQ112x112 fixed point (a price of 1 is 2**112). Both wrap around on overflow.
+     * The time-weighted average price between two observations is the difference of the cumulative prices
+     * divided by the elapsed time (see `twap` in scripts/amm.py).
+     */
+    function observe() external view returns (uint tokenPriceCumulative, uint ethPriceCumulative, uint32 blockTimestamp);
+
+    /**
+     * @dev Returns what {buyTokens} would currently return for `amount`: the total price in ETH including the fee,
+     * the ETH fee and the token fee. Reverts if the pool holds `amount` tokens or fewer.
+     * Like the other quote views, it reverts while the exchange is not initialized.
+     */
+    function quoteBuyTokens(uint amount) external view returns (uint price, uint ethFee, uint tokenFee);
+
+    /**
+     * @dev Returns what {sellTokens} would currently return for `amount`: the ETH paid after the fee,
+     * the ETH fee and the token fee.
+     */
+    function quoteSellTokens(uint amount) external view returns (uint value, uint ethFee, uint tokenFee);
+
+    /**
+     * @dev Returns the tokens and ETH that {mintLiquidityTokens} would currently spend to mint `amount` liquidity tokens.
+     */
+    function quoteMintLiquidityTokens(uint amount) external view returns (uint tokens, uint eth);
+
+    /**
+     * @dev Returns the tokens and ETH that {burnLiquidityTokens} would currently credit for burning `amount` liquidity tokens.
+     * Reverts if `amount` exceeds the total supply of liquidity tokens.
+     */
+    function quoteBurnLiquidityTokens(uint amount) external view returns (uint tokens, uint eth);
+
 
     /**
      * @dev Swap ETH for tokens.
@@ -30,6 +120,8 @@ interface IExchange is IERC20 {
      * Note that the fee is taken in *both* tokens and ETH. The fee percentage is taken from `amount` tokens 
      * (rounded up) *after* they are bought, and taken from the ETH sent (rounded up) *before* the purchase.
      * @return Returns a tuple with the actual total value in ETH incluing the fee, the eth fee and the token fee.
+     *
+     * Emits a {TokensBought} event.
      */
     function buyTokens(uint amount, uint maxPrice) external payable returns (uint,uint,uint);
 
@@ -39,22 +131,65 @@ interface IExchange is IERC20 {
      * Note that the fee is taken in *both* tokens and ETH. The fee percentage is taken from `amount` tokens 
      * (rounded up) *before* selling, and taken from the ETH returned (rounded up) *after* selling.
      * @return Returns a tuple with the actual total value in ETH minus the fee, the eth fee and the token fee.
+     *
+     * Emits a {TokensSold} event.
      */
     function sellTokens(uint amount, uint minPrice) external returns (uint,uint,uint);
 
+    /**
+     * @dev Same as {sellTokens}, but first approves the exchange to spend `amount` of the caller's tokens with
+     * an EIP-2612 permit signature valid until `deadline`.
+     */
+    function sellTokensWithPermit(uint amount, uint minPrice, uint deadline, Signature calldata permitSig) external returns (uint,uint,uint);
+
+    /**
+     * @dev Settles many buy and sell orders in one transaction at a single clearing price.
+     * Fees are taken from every order as in {buyTokens} and {sellTokens}: the token fee of a buy from the bought tokens,
+     * of a sell from the sold tokens, and the ETH fee (rounded up) on top of a buy's cost and from a sell's proceeds.
+     * The orders are netted against each other, and only the net imbalance is traded against the constant-product curve:
+     *  * `net` is the total bought minus the total sold after the sell token fees.
+     *  * If `net > 0`, the pool sells `net` tokens for the ETH `ethIn` that keeps the reserve product (rounded up),
+     *    and the clearing price is `ethIn / net` ETH per token.
+     *  * If `net < 0`, the pool buys `-net` tokens for the ETH `ethOut` that keeps the reserve product (rounded down),
+     *    and the clearing price is `ethOut / -net`.
+     *  * If `net == 0`, nothing is traded against the curve, and the clearing price is the spot price `ethReserve / tokenReserve`.
+     * A buy of `amount` tokens costs `amount` times the clearing price (rounded up) plus its ETH fee; a sell of
+     * `amount` tokens is worth `amount` minus its token fee times the clearing price (rounded down), minus its ETH fee.
+     * A single buy (or sell) order costs (or is worth) exactly what {buyTokens} (or {sellTokens}) would return.
+     *
+     * The caller funds the batch: the msg value must cover the total price of the buy orders (any excess is returned), and the
+     * caller must approve the exchange to transfer the total amount of the sell orders from its account.
+     * The whole batch reverts if any order's `limit` is not met. `scripts/batch_orders.py` collects orders and builds batches
+     * whose limits are all met.
+     * @return Returns the total ETH paid for the buy orders and the total ETH paid out for the sell orders.
+     *
+     * Emits a {BatchSettled} event.
+     */
+    function settleBatch(Order[] calldata buys, Order[] calldata sells) external payable returns (uint ethPaid, uint ethReceived);
+
    /**
      * @dev mint `amount` liquidity tokens, as long as the total number of tokens spent is at most `maxTOK`
      * and the total amount of ETH spent is `maxETH`. The token allowance for the exchange address must be at least `maxTOK`,
      * and the msg value at least `maxETH`.
      * Unused funds will be returned to the sender.
      * @return returns a tuple consisting of (token_spent, eth_spent). 
+     *
+     * Emits a {LiquidityMinted} event.
      */
     function mintLiquidityTokens(uint amount, uint maxTOK, uint maxETH) external payable returns (uint,uint);
 
+    /**
+     * @dev Same as {mintLiquidityTokens}, but first approves the exchange to spend `maxTOK` of the caller's tokens with
+     * an EIP-2612 permit signature valid until `deadline`.
+     */
+    function mintLiquidityTokensWithPermit(uint amount, uint maxTOK, uint maxETH, uint deadline, Signature calldata permitSig) external payable returns (uint,uint);
+
     /**
      * @dev burn `amount` liquidity tokens, as long as this will result in at least minTOK tokens and at least minETH eth being generated.
      * The resulting tokens and ETH will be credited to the sender.
      * @return Returns a tuple consisting of (token_credited, eth_credited). 
+     *
+     * Emits a {LiquidityBurned} event.
      */
     function burnLiquidityTokens(uint amount, uint minTOK, uint minETH) external payable returns (uint,uint);
 }
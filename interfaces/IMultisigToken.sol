@@ -16,6 +16,12 @@ struct Signature {
  * @dev Interface of tokens supporting 2-out-of-3 multisig accounts.
  */
 interface IMultisigToken {
+    /**
+     * @dev Emitted when the unordered nonces in `mask` of word `wordPos` of `multisigOwner` are invalidated
+     * (see {invalidateUnorderedNonces}).
+     */
+    event UnorderedNonceInvalidation(address indexed multisigOwner, uint256 wordPos, uint256 mask);
+
     /**
      * @dev registers a multisig address controlled by the public keys `pk1`, `pk2` and `pk3`.
      * The returned address should always match 
@@ -41,4 +47,39 @@ interface IMultisigToken {
      */
     function transfer2of3(address multisigOwner, address recipient, uint256 amount, uint nonce, Signature calldata secondSig) external returns (bool);
 
+    /**
+     * @dev Moves `amounts[i]` tokens from the multisig address `multisigOwner` to `recipients[i]`, for each i.
+     *
+     * Same rules as {transfer2of3}, but the whole batch is approved by a single `secondSig` and consumes a single `nonce`.
+     * The batch reverts as a whole if any of the transfers is invalid.
+     *
+     * Emits a {Transfer} event for each recipient.
+     */
+    function transfer2of3Batch(address multisigOwner, address[] calldata recipients, uint256[] calldata amounts, uint nonce, Signature calldata secondSig) external returns (bool);
+
+    /**
+     * @dev Same as {transfer2of3}, but with an unordered nonce: any nonce not used before by `multisigOwner` is accepted,
+     * so transfers can be signed and mined in any order, and a stuck transfer doesn't block the others.
+     * Unordered nonces are tracked in a bitmap per multisig address (see {nonceBitmap}), independently of the ordered {transfer2of3} nonce.
+     * `secondSig` signs keccak256(abi.encodePacked("transfer2of3Unordered", address(this), recipient, multisigOwner, amount, nonce)),
+     * so a signature can't be reused with {transfer2of3} or {transfer2of3Batch}.
+     *
+     * Emits a {Transfer} event.
+     */
+    function transfer2of3Unordered(address multisigOwner, address recipient, uint256 amount, uint256 nonce, Signature calldata secondSig) external returns (bool);
+
+    /**
+     * @dev Returns word `wordPos` of the unordered nonce bitmap of `multisigOwner`:
+     * bit `i` is set if nonce `wordPos * 256 + i` has been used (or invalidated).
+     */
+    function nonceBitmap(address multisigOwner, uint256 wordPos) external view returns (uint256);
+
+    /**
+     * @dev Marks the unordered nonces in `mask` of word `wordPos` of `multisigOwner` as used, cancelling any signed
+     * transfers with those nonces that were not mined yet. `msg.sender` must be one of the public keys controlling `multisigOwner`.
+     *
+     * Emits an {UnorderedNonceInvalidation} event.
+     */
+    function invalidateUnorderedNonces(address multisigOwner, uint256 wordPos, uint256 mask) external;
+
 }
\ No newline at end of file
@@ -0,0 +1,207 @@
+from typing import List, NamedTuple, Tuple
+
+# Off-chain model of the RUExchange constant-product pool.
+# It follows the pricing rules documented on `buyTokens`, `sellTokens`, `mintLiquidityTokens` and `burnLiquidityTokens`:
+#  * Fees are taken in both tokens and ETH, and always rounded up.
+#  * Buying: the ETH fee is taken from the payment before the trade, the token fee from the bought tokens after it.
+#  * Selling: the token fee is taken from the sold tokens before the trade, the ETH fee from the proceeds after it.
+#  * The token/ETH product is kept constant for the trade itself (before the fees are deposited), rounding in favor of the pool.
+#  * Liquidity is minted and burned proportionally to the reserves, rounding in favor of the pool.
+# Quotes are plain integer arithmetic, so they take microseconds and need no RPC calls.
+# The quote views of RUExchange (`quoteBuyTokens`, `quoteSellTokens`, `quoteMintLiquidityTokens` and
+# `quoteBurnLiquidityTokens`) use the same arithmetic on chain.
+
+
+def ceil_div(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+# Fee (rounded up) of `fee_percent` percent of `value`.
+def fee_of(value: int, fee_percent: int) -> int:
+    return ceil_div(value * fee_percent, 100)
+
+
+# Returns (price, eth_fee, token_fee) for buying `amount` tokens from a pool with the given reserves.
+# `price` is the total ETH paid including `eth_fee`; the buyer receives `amount - token_fee` tokens.
+def quote_buy(token_reserve: int, eth_reserve: int, fee_percent: int, amount: int) -> Tuple[int, int, int]:
+    if not 0 <= amount < token_reserve:
+        raise ValueError("can't buy more tokens than the pool holds")
+    # ETH that must reach the pool (after the fee) to keep token_reserve * eth_reserve constant
+    eth_in = ceil_div(token_reserve * eth_reserve, token_reserve - amount) - eth_reserve
+    # Smallest payment whose remainder after the (rounded up) fee covers eth_in
+    price = ceil_div(eth_in * 100, 100 - fee_percent)
+    return (price, price - eth_in, fee_of(amount, fee_percent))
+
+
+# Returns (value, eth_fee, token_fee) for selling `amount` tokens to a pool with the given reserves.
+# `value` is the ETH the seller receives, after `eth_fee` was deducted.
+def quote_sell(token_reserve: int, eth_reserve: int, fee_percent: int, amount: int) -> Tuple[int, int, int]:
+    if amount < 0:
+        raise ValueError("amount must be non-negative")
+    if token_reserve == 0:
+        raise ValueError("exchange is not initialized")
+    token_fee = fee_of(amount, fee_percent)
+    tokens_in = amount - token_fee
+    eth_out = eth_reserve - ceil_div(token_reserve * eth_reserve, token_reserve + tokens_in)
+    eth_fee = fee_of(eth_out, fee_percent)
+    return (eth_out - eth_fee, eth_fee, token_fee)
+
+
+# Returns (tokens, eth) that must be deposited to mint `amount` liquidity tokens.
+def quote_mint_liquidity(token_reserve: int, eth_reserve: int, total_liquidity: int, amount: int) -> Tuple[int, int]:
+    if total_liquidity == 0:
+        raise ValueError("exchange is not initialized")
+    return (ceil_div(amount * token_reserve, total_liquidity), ceil_div(amount * eth_reserve, total_liquidity))
+
+
+# Returns (tokens, eth) credited for burning `amount` liquidity tokens.
+def quote_burn_liquidity(token_reserve: int, eth_reserve: int, total_liquidity: int, amount: int) -> Tuple[int, int]:
+    if total_liquidity == 0:
+        raise ValueError("exchange is not initialized")
+    if amount > total_liquidity:
+        raise ValueError("can't burn more than the total liquidity")
+    return (amount * token_reserve // total_liquidity, amount * eth_reserve // total_liquidity)
+
+
+# Clearing price (numerator, denominator) in ETH per token of a batch in which `tokens_bought` tokens are bought and
+# `tokens_sold` tokens (after the token fees) are sold: only the net imbalance is traded against the pool.
+def batch_clearing_price(token_reserve: int, eth_reserve: int, tokens_bought: int, tokens_sold: int) -> Tuple[int, int]:
+    net = tokens_bought - tokens_sold
+    if net > 0:
+        if net >= token_reserve:
+            raise ValueError("can't buy more tokens than the pool holds")
+        return (ceil_div(token_reserve * eth_reserve, token_reserve - net) - eth_reserve, net)
+    if net < 0:
+        return (eth_reserve - ceil_div(token_reserve * eth_reserve, token_reserve - net), -net)
+    return (eth_reserve, token_reserve)
+
+
+# Returns the quotes of a batch settled by `settleBatch`, for lists of buy and sell order amounts:
+# a (price, eth_fee, token_fee) tuple per buy and a (value, eth_fee, token_fee) tuple per sell, as for single trades.
+# A batch with a single order is priced exactly like `quote_buy` or `quote_sell`.
+def quote_batch(token_reserve: int, eth_reserve: int, fee_percent: int, buys: List[int], sells: List[int]) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, int]]]:
+    if min(buys + sells, default=0) < 0:
+        raise ValueError("amounts must be non-negative")
+    sell_token_fees = [fee_of(amount, fee_percent) for amount in sells]
+    numerator, denominator = batch_clearing_price(token_reserve, eth_reserve, sum(buys), sum(sells) - sum(sell_token_fees))
+
+    buy_quotes = []
+    for amount in buys:
+        eth_in = ceil_div(amount * numerator, denominator)
+        price = ceil_div(eth_in * 100, 100 - fee_percent)
+        buy_quotes.append((price, price - eth_in, fee_of(amount, fee_percent)))
+    sell_quotes = []
+    for amount, token_fee in zip(sells, sell_token_fees):
+        eth_out = (amount - token_fee) * numerator // denominator
+        eth_fee = fee_of(eth_out, fee_percent)
+        sell_quotes.append((eth_out - eth_fee, eth_fee, token_fee))
+    return (buy_quotes, sell_quotes)
+
+
+Q112 = 2**112 # 1.0 in UQ112x112 fixed point
+
+
+class PriceObservation(NamedTuple):
+    """
+    Cumulative prices of an RUExchange pool at a (32-bit) block timestamp, as returned by `observe`.
+    """
+    token_price_cumulative: int # Sum over time of the ETH-per-token price, in seconds times UQ112x112
+    eth_price_cumulative: int # Sum over time of the tokens-per-ETH price, in seconds times UQ112x112
+    timestamp: int
+
+
+def observe(exch) -> PriceObservation:
+    return PriceObservation(*exch.observe())
+
+
+# Increments of the cumulative (ETH-per-token, tokens-per-ETH) prices after `elapsed` seconds at the given reserves,
+# computed as in RUExchange.
+def cumulative_price_increments(token_reserve: int, eth_reserve: int, elapsed: int) -> Tuple[int, int]:
+    if elapsed == 0 or token_reserve == 0 or eth_reserve == 0:
+        return (0, 0)
+    return ((eth_reserve * Q112 // token_reserve) * elapsed, (token_reserve * Q112 // eth_reserve) * elapsed)
+
+
+# Returns the time-weighted average (ETH-per-token, tokens-per-ETH) prices between two observations, in UQ112x112.
+# Wrap-around of the accumulators (mod 2**256) and of the 32-bit timestamps is handled, as long as the
+# observations are less than 2**32 seconds apart.
+def twap(older: PriceObservation, newer: PriceObservation) -> Tuple[int, int]:
+    elapsed = (newer.timestamp - older.timestamp) % 2**32
+    if elapsed == 0:
+        raise ValueError("observations must be taken at different times")
+    return ((newer.token_price_cumulative - older.token_price_cumulative) % 2**256 // elapsed,
+            (newer.eth_price_cumulative - older.eth_price_cumulative) % 2**256 // elapsed)
+
+
+def from_uq112x112(value: int) -> float:
+    return value / Q112
+
+
+class ConstantProductPool:
+    """
+    Local copy of an RUExchange pool state. The `quote_*` methods only compute, while `buy`, `sell`,
+    `mint_liquidity` and `burn_liquidity` also apply the trade to the local state, so a sequence of trades can be simulated.
+    """
+    def __init__(self, token_reserve: int, eth_reserve: int, fee_percent: int, total_liquidity: int) -> None:
+        self.token_reserve = token_reserve
+        self.eth_reserve = eth_reserve
+        self.fee_percent = fee_percent
+        self.total_liquidity = total_liquidity
+
+    # Snapshot of a deployed exchange (the fee percent is not exposed by IExchange, so it must be given).
+    @classmethod
+    def from_exchange(cls, exch, fee_percent: int) -> 'ConstantProductPool':
+        token_reserve, eth_reserve, _ = exch.getReserves()
+        return cls(token_reserve, eth_reserve, fee_percent, exch.totalSupply())
+
+    def quote_buy(self, amount: int) -> Tuple[int, int, int]:
+        return quote_buy(self.token_reserve, self.eth_reserve, self.fee_percent, amount)
+
+    def quote_sell(self, amount: int) -> Tuple[int, int, int]:
+        return quote_sell(self.token_reserve, self.eth_reserve, self.fee_percent, amount)
+
+    def quote_mint_liquidity(self, amount: int) -> Tuple[int, int]:
+        return quote_mint_liquidity(self.token_reserve, self.eth_reserve, self.total_liquidity, amount)
+
+    def quote_burn_liquidity(self, amount: int) -> Tuple[int, int]:
+        return quote_burn_liquidity(self.token_reserve, self.eth_reserve, self.total_liquidity, amount)
+
+    def quote_batch(self, buys: List[int], sells: List[int]) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, int]]]:
+        return quote_batch(self.token_reserve, self.eth_reserve, self.fee_percent, buys, sells)
+
+    def buy(self, amount: int, max_price: int = None) -> Tuple[int, int, int]:
+        price, eth_fee, token_fee = quote = self.quote_buy(amount)
+        if max_price is not None and price > max_price:
+            raise ValueError("price is above max_price")
+        self.token_reserve -= amount - token_fee
+        self.eth_reserve += price
+        return quote
+
+    def sell(self, amount: int, min_price: int = 0) -> Tuple[int, int, int]:
+        value, eth_fee, token_fee = quote = self.quote_sell(amount)
+        if value < min_price:
+            raise ValueError("value is below min_price")
+        self.token_reserve += amount
+        self.eth_reserve -= value
+        return quote
+
+    # Settles a batch of buy and sell order amounts (limits are not checked; see scripts/batch_orders.py).
+    def settle_batch(self, buys: List[int], sells: List[int]) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, int]]]:
+        buy_quotes, sell_quotes = quote = self.quote_batch(buys, sells)
+        self.token_reserve += sum(sells) - sum(amount - token_fee for amount, (_, _, token_fee) in zip(buys, buy_quotes))
+        self.eth_reserve += sum(price for price, _, _ in buy_quotes) - sum(value for value, _, _ in sell_quotes)
+        return quote
+
+    def mint_liquidity(self, amount: int) -> Tuple[int, int]:
+        tokens, eth = quote = self.quote_mint_liquidity(amount)
+        self.token_reserve += tokens
+        self.eth_reserve += eth
+        self.total_liquidity += amount
+        return quote
+
+    def burn_liquidity(self, amount: int) -> Tuple[int, int]:
+        tokens, eth = quote = self.quote_burn_liquidity(amount)
+        self.token_reserve -= tokens
+        self.eth_reserve -= eth
+        self.total_liquidity -= amount
+        return quote
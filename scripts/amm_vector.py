@@ -0,0 +1,66 @@
+from typing import Tuple
+
+import numpy as np
+
+# Vectorized versions of the quotes in scripts/amm.py, for evaluating a whole price impact curve at once.
+# `amounts` (and optionally `fee_percent`) are arrays; the pool reserves are plain integers.
+# The results match the scalar quotes exactly: with dtype=np.int64 (the default when every intermediate
+# value fits) the arithmetic is done in machine integers, otherwise in Python integers (dtype=object).
+# Asking for np.int64 when an intermediate value could overflow raises OverflowError.
+
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+# Converts the inputs to arrays of a dtype in which the largest intermediate value `bound` can't overflow.
+def _prepare(bound: int, dtype, *values):
+    if dtype is None:
+        dtype = np.dtype(np.int64) if bound <= INT64_MAX else np.dtype(object)
+    dtype = np.dtype(dtype)
+    if dtype == np.dtype(np.int64):
+        if bound > INT64_MAX:
+            raise OverflowError("intermediate values do not fit in int64; use dtype=object")
+    elif dtype != np.dtype(object):
+        raise ValueError("dtype must be np.int64 or object")
+    return [np.asarray(value, dtype=dtype) for value in values]
+
+
+def _check_inputs(amounts: np.ndarray, fees: np.ndarray) -> None:
+    if amounts.size and amounts.min() < 0:
+        raise ValueError("amounts must be non-negative")
+    if fees.size and (fees.min() < 0 or fees.max() >= 100):
+        raise ValueError("fee_percent must be in [0, 100)")
+
+
+def _max(values) -> int:
+    values = np.asarray(values, dtype=object)
+    return int(values.max()) if values.size else 0
+
+
+# Returns arrays (price, eth_fee, token_fee) for buying each of `amounts` tokens; see `scripts.amm.quote_buy`.
+def quote_buy_array(token_reserve: int, eth_reserve: int, fee_percent, amounts, dtype=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # eth_in <= token_reserve * eth_reserve, and the price computation multiplies it by 100
+    bound = 100 * token_reserve * eth_reserve + 100 * _max(amounts) + token_reserve
+    amounts, fees = _prepare(bound, dtype, amounts, fee_percent)
+    _check_inputs(amounts, fees)
+    if amounts.size and amounts.max() >= token_reserve:
+        raise ValueError("can't buy more tokens than the pool holds")
+
+    eth_in = _ceil_div(token_reserve * eth_reserve, token_reserve - amounts) - eth_reserve
+    price = _ceil_div(eth_in * 100, 100 - fees)
+    return (price, price - eth_in, _ceil_div(amounts * fees, 100))
+
+
+# Returns arrays (value, eth_fee, token_fee) for selling each of `amounts` tokens; see `scripts.amm.quote_sell`.
+def quote_sell_array(token_reserve: int, eth_reserve: int, fee_percent, amounts, dtype=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    bound = 100 * token_reserve * eth_reserve + 100 * _max(amounts) + token_reserve
+    amounts, fees = _prepare(bound, dtype, amounts, fee_percent)
+    _check_inputs(amounts, fees)
+
+    token_fee = _ceil_div(amounts * fees, 100)
+    eth_out = eth_reserve - _ceil_div(token_reserve * eth_reserve, token_reserve + amounts - token_fee)
+    eth_fee = _ceil_div(eth_out * fees, 100)
+    return (eth_out - eth_fee, eth_fee, token_fee)
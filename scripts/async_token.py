@@ -0,0 +1,138 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+import aiohttp
+from eth_abi import decode_abi, encode_abi
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+from brownie import RUToken, web3
+
+
+class RPCError(Exception):
+    pass
+
+
+class AsyncRUToken:
+    """
+    asyncio client for the read-only RUToken functions (`balanceOf`, `allowance`, `nonce` and `getMultisigAddress`).
+
+    Calls made in the same event loop iteration are sent together as a single JSON-RPC batch of `eth_call`s
+    (at most `max_batch` calls per HTTP request), over a pool of keep-alive connections.
+    Identical calls that are already in flight are merged, so they cost a single `eth_call`.
+    """
+    VIEW_FUNCTIONS = ('balanceOf', 'allowance', 'nonce', 'getMultisigAddress')
+
+    def __init__(self, endpoint_uri: str, address: str, abi: List[dict] = None, max_batch: int = 100, connections: int = 8, block: str = 'latest') -> None:
+        self.endpoint_uri = endpoint_uri
+        self.address = address
+        self.max_batch = max_batch
+        self.connections = connections
+        self.block = block
+
+        self.requests_sent = 0 # Number of HTTP requests sent
+        self.calls_sent = 0 # Number of eth_calls sent (after merging identical calls)
+
+        # function name -> (selector, input types, output types)
+        self._functions = {}
+        for entry in (abi if abi is not None else RUToken.abi):
+            if entry.get('type') == 'function' and entry['name'] in self.VIEW_FUNCTIONS:
+                input_types = [arg['type'] for arg in entry['inputs']]
+                output_types = [arg['type'] for arg in entry['outputs']]
+                selector = function_signature_to_4byte_selector(f"{entry['name']}({','.join(input_types)})")
+                self._functions[entry['name']] = (selector, input_types, output_types)
+
+        self._session = None
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._pending: List[Tuple[Tuple, str, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self._tasks = set()
+
+    # Client for a deployed brownie contract, using brownie's current RPC endpoint.
+    @classmethod
+    def from_contract(cls, tok: RUToken, **kwargs) -> 'AsyncRUToken':
+        return cls(web3.provider.endpoint_uri, tok.address, tok.abi, **kwargs)
+
+    async def balanceOf(self, account) -> int:
+        return await self._call('balanceOf', account)
+
+    async def allowance(self, owner, spender) -> int:
+        return await self._call('allowance', owner, spender)
+
+    async def nonce(self, multisig_address) -> int:
+        return await self._call('nonce', multisig_address)
+
+    async def getMultisigAddress(self, pk1, pk2, pk3) -> str:
+        return await self._call('getMultisigAddress', pk1, pk2, pk3)
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncRUToken':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _call(self, name: str, *args):
+        args = tuple(getattr(arg, 'address', arg) for arg in args)
+        key = (name, args)
+        if key not in self._inflight:
+            selector, input_types, _ = self._functions[name]
+            data = '0x' + (selector + encode_abi(input_types, args)).hex()
+
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._pending.append((key, data, future))
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif not self._flush_scheduled:
+                self._flush_scheduled = True
+                asyncio.get_running_loop().call_soon(self._flush)
+
+        # Shield so that one cancelled caller does not cancel the merged call for everyone else.
+        return await asyncio.shield(self._inflight[key])
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[Tuple, str, asyncio.Future]]) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.connections, keepalive_timeout=60))
+
+        payload = [
+            {'jsonrpc': '2.0', 'id': i, 'method': 'eth_call', 'params': [{'to': self.address, 'data': data}, self.block]}
+            for i, (_, data, _) in enumerate(batch)
+        ]
+        self.requests_sent += 1
+        self.calls_sent += len(batch)
+        try:
+            async with self._session.post(self.endpoint_uri, json=payload) as response:
+                response.raise_for_status()
+                results = {result['id']: result for result in await response.json()}
+
+            for i, (key, _, future) in enumerate(batch):
+                result = results.get(i)
+                if result is None:
+                    future.set_exception(RPCError(f"missing response for {key[0]}"))
+                elif 'error' in result:
+                    future.set_exception(RPCError(result['error'].get('message', result['error'])))
+                else:
+                    output_type = self._functions[key[0]][2][0]
+                    value = decode_abi([output_type], bytes.fromhex(result['result'][2:]))[0]
+                    future.set_result(to_checksum_address(value) if output_type == 'address' else value)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key, _, _ in batch:
+                self._inflight.pop(key, None)
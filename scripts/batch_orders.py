@@ -0,0 +1,108 @@
+import threading
+from typing import List, NamedTuple, Tuple
+
+from brownie import RUExchange, RUToken
+
+from scripts.amm import ConstantProductPool
+
+# Collects buy and sell orders and turns them into `settleBatch` calls on RUExchange, so opposing orders are netted
+# against each other and only the imbalance moves the pool (see `settleBatch` in interfaces/IExchange.sol).
+# The operator that submits a batch funds it: it pays the ETH for the buy orders and delivers the tokens for the
+# sell orders, and the exchange pays out to each order's recipient.
+
+
+class Order(NamedTuple):
+    recipient: str
+    amount: int
+    limit: int # Maximum total price in ETH for a buy, minimum value in ETH for a sell
+
+    # Encode as a tuple suitable for passing as an IExchange.Order struct.
+    def encoded(self) -> Tuple[str, int, int]:
+        return (getattr(self.recipient, 'address', self.recipient), self.amount, self.limit)
+
+
+class Batch(NamedTuple):
+    buys: List[Order]
+    sells: List[Order]
+    buy_quotes: List[Tuple[int, int, int]] # (price, eth_fee, token_fee) per buy
+    sell_quotes: List[Tuple[int, int, int]] # (value, eth_fee, token_fee) per sell
+    rejected: List[Order] # Orders left out because their limit could not be met
+
+    # ETH the operator must send with the batch.
+    def eth_value(self) -> int:
+        return sum(price for price, _, _ in self.buy_quotes)
+
+    # Tokens the operator must allow the exchange to transfer.
+    def token_amount(self) -> int:
+        return sum(order.amount for order in self.sells)
+
+
+# Returns the batch of `buys` and `sells` that `pool` would settle with every order's limit met.
+# Orders whose limit is not met at the batch's clearing price are rejected, and the price is recomputed
+# without them, until all remaining orders are satisfied.
+def build_batch(pool: ConstantProductPool, buys: List[Order], sells: List[Order]) -> Batch:
+    buys, sells, rejected = list(buys), list(sells), []
+    while True:
+        try:
+            buy_quotes, sell_quotes = pool.quote_batch([order.amount for order in buys], [order.amount for order in sells])
+        except ValueError: # The net buy exceeds the pool; drop the largest buy and retry
+            largest = max(buys, key=lambda order: order.amount)
+            buys.remove(largest)
+            rejected.append(largest)
+            continue
+        bad_buys = [order for order, (price, _, _) in zip(buys, buy_quotes) if price > order.limit]
+        bad_sells = [order for order, (value, _, _) in zip(sells, sell_quotes) if value < order.limit]
+        if not bad_buys and not bad_sells:
+            return Batch(buys, sells, buy_quotes, sell_quotes, rejected)
+        buys = [order for order in buys if order not in bad_buys]
+        sells = [order for order in sells if order not in bad_sells]
+        rejected += bad_buys + bad_sells
+
+
+class OrderCollector:
+    """
+    Accumulates orders (e.g. from request handlers on several threads) for one exchange, and settles everything
+    collected so far as one batch with `settle`. Rejected orders are returned to the caller rather than kept.
+    """
+    def __init__(self, exch: RUExchange, tok: RUToken, fee_percent: int) -> None:
+        self.exch = exch
+        self.tok = tok
+        self.fee_percent = fee_percent # Not exposed by IExchange, so it must be given
+        self._lock = threading.Lock()
+        self._buys = []
+        self._sells = []
+
+    def add_buy(self, recipient, amount: int, max_price: int) -> None:
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        with self._lock:
+            self._buys.append(Order(recipient, amount, max_price))
+
+    def add_sell(self, recipient, amount: int, min_price: int) -> None:
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        with self._lock:
+            self._sells.append(Order(recipient, amount, min_price))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buys) + len(self._sells)
+
+    # Takes the collected orders and builds their batch against the current pool state, without sending anything.
+    def take_batch(self) -> Batch:
+        with self._lock:
+            buys, sells = self._buys, self._sells
+            self._buys, self._sells = [], []
+        return build_batch(ConstantProductPool.from_exchange(self.exch, self.fee_percent), buys, sells)
+
+    # Builds a batch from the collected orders and settles it from `operator` (a brownie account), which pays
+    # for the buys and delivers the tokens for the sells. Returns the batch and the transaction (None if the batch is empty).
+    def settle(self, operator) -> Tuple[Batch, object]:
+        batch = self.take_batch()
+        if not batch.buys and not batch.sells:
+            return (batch, None)
+        if batch.token_amount():
+            self.tok.approve(self.exch, batch.token_amount(), {'from': operator})
+        tx = self.exch.settleBatch([order.encoded() for order in batch.buys], [order.encoded() for order in batch.sells],
+                                   {'from': operator, 'value': batch.eth_value()})
+        return (batch, tx)
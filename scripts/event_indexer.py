@@ -0,0 +1,214 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+from brownie import web3
+
+TRANSFER_TOPIC = HexBytes(keccak(text='Transfer(address,address,uint256)'))
+APPROVAL_TOPIC = HexBytes(keccak(text='Approval(address,address,uint256)'))
+
+
+class ColumnStore:
+    """
+    Append-only table stored as one flat binary file per column, read back through numpy memory maps.
+    `columns` maps each column name to a (dtype, width) pair: a row stores `width` items of `dtype` in that column
+    (e.g. (np.uint8, 20) for an address, (np.uint8, 32) for a big-endian uint256, (np.uint64, 1) for a block number).
+    The committed row count is kept in `checkpoint.json`, together with any extra checkpoint fields,
+    so rows written after the last checkpoint (e.g. by an interrupted sync) are dropped when the store is opened.
+    """
+    def __init__(self, directory: str, columns: Dict[str, Tuple]) -> None:
+        self.directory = directory
+        self.columns = {name: (np.dtype(dtype), width) for name, (dtype, width) in columns.items()}
+        os.makedirs(directory, exist_ok=True)
+
+        self.checkpoint = {'rows': 0}
+        checkpoint_file = os.path.join(directory, 'checkpoint.json')
+        if os.path.exists(checkpoint_file):
+            with open(checkpoint_file) as f:
+                self.checkpoint = json.load(f)
+
+        for name, (dtype, width) in self.columns.items():
+            path = self._path(name)
+            with open(path, 'ab') as f:
+                f.truncate(self.checkpoint['rows'] * dtype.itemsize * width)
+        self._maps = {}
+
+    def __len__(self) -> int:
+        return self.checkpoint['rows']
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name + '.bin')
+
+    # Appends rows given as one array-like per column, then commits them together with `checkpoint` fields.
+    def append(self, rows: Dict[str, list], **checkpoint) -> None:
+        count = None
+        for name, (dtype, width) in self.columns.items():
+            data = np.ascontiguousarray(rows[name], dtype=dtype).reshape(-1, width)
+            if count is not None and len(data) != count:
+                raise ValueError("all columns must have the same number of rows")
+            count = len(data)
+            with open(self._path(name), 'ab') as f:
+                f.write(data.tobytes())
+
+        self.commit(rows=self.checkpoint['rows'] + count, **checkpoint)
+
+    # Atomically updates the checkpoint file.
+    def commit(self, **checkpoint) -> None:
+        self.checkpoint.update(checkpoint)
+        checkpoint_file = os.path.join(self.directory, 'checkpoint.json')
+        with open(checkpoint_file + '.tmp', 'w') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(checkpoint_file + '.tmp', checkpoint_file)
+        self._maps = {}
+
+    # Read-only view of a column, with shape (rows, width) (or (rows,) when width is 1).
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._maps:
+            dtype, width = self.columns[name]
+            shape = (len(self), width) if width > 1 else (len(self),)
+            if len(self) == 0:
+                self._maps[name] = np.empty(shape, dtype=dtype)
+            else:
+                self._maps[name] = np.memmap(self._path(name), dtype=dtype, mode='r', shape=shape)
+        return self._maps[name]
+
+
+class AddressIndex:
+    """
+    Sorted index over an address column (shape (rows, 20)), returning the rows that hold a given address.
+    """
+    def __init__(self, column: np.ndarray) -> None:
+        keys = np.ascontiguousarray(column).view('S20').ravel()
+        self._order = np.argsort(keys, kind='stable') # Rows of equal addresses stay in log order
+        self._keys = keys[self._order]
+
+    def rows(self, address: str) -> np.ndarray:
+        key = np.array(bytes.fromhex(address[2:]), dtype='S20')
+        lo = np.searchsorted(self._keys, key, 'left')
+        hi = np.searchsorted(self._keys, key, 'right')
+        return self._order[lo:hi]
+
+
+# Returns the logs emitted by `address` with one of `topics` as topic0, from `from_block` to `to_block` (inclusive).
+def fetch_logs(address: str, topics: List[bytes], from_block: int, to_block: int) -> List[dict]:
+    return web3.eth.get_logs({
+        'address': address,
+        'fromBlock': from_block,
+        'toBlock': to_block,
+        'topics': [['0x' + bytes(topic).hex() for topic in topics]],
+    })
+
+
+def _topic_address(topic) -> bytes:
+    return bytes(HexBytes(topic))[12:]
+
+
+def _uint256(row: np.ndarray) -> int:
+    return int.from_bytes(row.tobytes(), 'big')
+
+
+class TokenEventIndex:
+    """
+    Incremental, on-disk index of the `Transfer` and `Approval` events of an ERC20 token (e.g. RUToken).
+    `sync` fetches new events from the node, starting at the last checkpointed block; the queries
+    (`balance_of`, `transfers_of`, `approvals_of`) only read the local store.
+
+    Balances are reconstructed from `Transfer` events alone, so the token must emit them for mints and burns too
+    (RUToken does, from/to the zero address).
+    """
+    def __init__(self, directory: str, token_address: str, start_block: int = 0) -> None:
+        self.token_address = token_address
+        address_column = (np.uint8, 20)
+        uint256_column = (np.uint8, 32)
+        self.transfers = ColumnStore(os.path.join(directory, 'transfers'), {
+            'block': (np.uint64, 1), 'log_index': (np.uint32, 1),
+            'from': address_column, 'to': address_column, 'value': uint256_column,
+        })
+        self.approvals = ColumnStore(os.path.join(directory, 'approvals'), {
+            'block': (np.uint64, 1), 'log_index': (np.uint32, 1),
+            'owner': address_column, 'spender': address_column, 'value': uint256_column,
+        })
+        self.next_block = min(self.transfers.checkpoint.get('next_block', start_block), self.approvals.checkpoint.get('next_block', start_block))
+        self._indexes = {}
+
+    # Indexes events up to `to_block` (default: latest block minus `confirmations`) in chunks of `batch_blocks` blocks.
+    # Returns the number of new events.
+    def sync(self, to_block: int = None, confirmations: int = 0, batch_blocks: int = 2000) -> int:
+        if to_block is None:
+            to_block = web3.eth.block_number - confirmations
+
+        added = 0
+        while self.next_block <= to_block:
+            last = min(self.next_block + batch_blocks - 1, to_block)
+            transfers = {name: [] for name in self.transfers.columns}
+            approvals = {name: [] for name in self.approvals.columns}
+            for log in fetch_logs(self.token_address, [TRANSFER_TOPIC, APPROVAL_TOPIC], self.next_block, last):
+                topics = log['topics']
+                if HexBytes(topics[0]) == TRANSFER_TOPIC:
+                    store, rows, first, second = self.transfers, transfers, 'from', 'to'
+                else:
+                    store, rows, first, second = self.approvals, approvals, 'owner', 'spender'
+                if log['blockNumber'] < store.checkpoint.get('next_block', 0):
+                    continue # Already stored before an interrupted sync
+                rows['block'].append(log['blockNumber'])
+                rows['log_index'].append(log['logIndex'])
+                rows[first].append(list(_topic_address(topics[1])))
+                rows[second].append(list(_topic_address(topics[2])))
+                rows['value'].append(list(bytes(HexBytes(log['data']))[-32:]))
+
+            self.transfers.append(transfers, next_block=last + 1)
+            self.approvals.append(approvals, next_block=last + 1)
+            added += len(transfers['block']) + len(approvals['block'])
+            self.next_block = last + 1
+            self._indexes = {}
+
+        return added
+
+    def _index(self, store: ColumnStore, name: str) -> AddressIndex:
+        key = (id(store), name)
+        if key not in self._indexes:
+            self._indexes[key] = AddressIndex(store.column(name))
+        return self._indexes[key]
+
+    # Rows of `store` where column `name` is `account`, limited to events at or before `block`.
+    def _rows(self, store: ColumnStore, name: str, account, block: int = None) -> np.ndarray:
+        rows = self._index(store, name).rows(getattr(account, 'address', account))
+        if block is not None:
+            rows = rows[store.column('block')[rows] <= block]
+        return rows
+
+    # Token balance of `account` after all events in `block` (default: the last indexed block).
+    def balance_of(self, account, block: int = None) -> int:
+        values = self.transfers.column('value')
+        received = sum(_uint256(values[row]) for row in self._rows(self.transfers, 'to', account, block))
+        sent = sum(_uint256(values[row]) for row in self._rows(self.transfers, 'from', account, block))
+        return received - sent
+
+    # Transfers from or to `account`, in chain order, as dicts with block, log_index, from, to and value.
+    def transfers_of(self, account, block: int = None) -> List[dict]:
+        rows = np.union1d(self._rows(self.transfers, 'from', account, block), self._rows(self.transfers, 'to', account, block))
+        return [self._transfer(row) for row in rows]
+
+    # Approvals granted by `account`, in chain order, as dicts with block, log_index, owner, spender and value.
+    def approvals_of(self, account, block: int = None) -> List[dict]:
+        store = self.approvals
+        return [{
+            'block': int(store.column('block')[row]),
+            'log_index': int(store.column('log_index')[row]),
+            'owner': to_checksum_address(store.column('owner')[row].tobytes()),
+            'spender': to_checksum_address(store.column('spender')[row].tobytes()),
+            'value': _uint256(store.column('value')[row]),
+        } for row in np.sort(self._rows(store, 'owner', account, block))]
+
+    def _transfer(self, row: int) -> dict:
+        store = self.transfers
+        return {
+            'block': int(store.column('block')[row]),
+            'log_index': int(store.column('log_index')[row]),
+            'from': to_checksum_address(store.column('from')[row].tobytes()),
+            'to': to_checksum_address(store.column('to')[row].tobytes()),
+            'value': _uint256(store.column('value')[row]),
+        }
@@ -0,0 +1,112 @@
+import os
+import time
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+from eth_utils import keccak
+from hexbytes import HexBytes
+from brownie import web3
+
+from scripts.event_indexer import ColumnStore, fetch_logs
+
+# Event kinds stored in the `kind` column
+BUY, SELL, MINT, BURN, BATCH = range(5)
+
+EVENT_TOPICS = {
+    HexBytes(keccak(text='TokensBought(address,uint256,uint256,uint256,uint256,uint256,uint256)')): BUY,
+    HexBytes(keccak(text='TokensSold(address,uint256,uint256,uint256,uint256,uint256,uint256)')): SELL,
+    HexBytes(keccak(text='LiquidityMinted(address,uint256,uint256,uint256,uint256,uint256,uint256)')): MINT,
+    HexBytes(keccak(text='LiquidityBurned(address,uint256,uint256,uint256,uint256,uint256,uint256)')): BURN,
+    HexBytes(keccak(text='BatchSettled(address,uint256,uint256,uint256,uint256,uint256,uint256)')): BATCH,
+}
+
+
+def _word(data: bytes, i: int) -> int:
+    return int.from_bytes(data[32 * i:32 * (i + 1)], 'big')
+
+
+def _uint256(row: np.ndarray) -> int:
+    return int.from_bytes(row.tobytes(), 'big')
+
+
+class ReserveHistory:
+    """
+    Local time series of an RUExchange pool (token reserve, ETH reserve and liquidity token supply after every
+    trade and liquidity change), built from the TokensBought, TokensSold, BatchSettled, LiquidityMinted and LiquidityBurned
+    events and stored on disk with the same append-only column files as `scripts.event_indexer`.
+    Swap events do not carry the liquidity supply, so it is carried forward from the last mint or burn.
+    """
+    def __init__(self, directory: str, exchange_address: str, start_block: int = 0) -> None:
+        self.exchange_address = exchange_address
+        uint256_column = (np.uint8, 32)
+        self.store = ColumnStore(os.path.join(directory, 'reserves'), {
+            'block': (np.uint64, 1), 'log_index': (np.uint32, 1), 'kind': (np.uint8, 1),
+            'token_reserve': uint256_column, 'eth_reserve': uint256_column, 'total_liquidity': uint256_column,
+        })
+        self.next_block = self.store.checkpoint.get('next_block', start_block)
+        self.total_liquidity = self.store.checkpoint.get('total_liquidity', 0)
+
+    # Stores the events up to `to_block` (default: latest block minus `confirmations`). Returns the number of new events.
+    def poll(self, to_block: int = None, confirmations: int = 0, batch_blocks: int = 2000) -> int:
+        if to_block is None:
+            to_block = web3.eth.block_number - confirmations
+
+        added = 0
+        while self.next_block <= to_block:
+            last = min(self.next_block + batch_blocks - 1, to_block)
+            rows = {name: [] for name in self.store.columns}
+            for log in fetch_logs(self.exchange_address, list(EVENT_TOPICS), self.next_block, last):
+                kind = EVENT_TOPICS[HexBytes(log['topics'][0])]
+                data = bytes(HexBytes(log['data']))
+                if kind in (MINT, BURN):
+                    token_reserve, eth_reserve, self.total_liquidity = _word(data, 3), _word(data, 4), _word(data, 5)
+                else:
+                    token_reserve, eth_reserve = _word(data, 4), _word(data, 5)
+                rows['block'].append(log['blockNumber'])
+                rows['log_index'].append(log['logIndex'])
+                rows['kind'].append(kind)
+                rows['token_reserve'].append(list(token_reserve.to_bytes(32, 'big')))
+                rows['eth_reserve'].append(list(eth_reserve.to_bytes(32, 'big')))
+                rows['total_liquidity'].append(list(self.total_liquidity.to_bytes(32, 'big')))
+
+            self.store.append(rows, next_block=last + 1, total_liquidity=self.total_liquidity)
+            added += len(rows['block'])
+            self.next_block = last + 1
+
+        return added
+
+    # Polls for new events every `interval` seconds, yielding the number of new events after each poll that found some.
+    def follow(self, interval: float = 1.0, confirmations: int = 0) -> Iterator[int]:
+        while True:
+            added = self.poll(confirmations=confirmations)
+            if added:
+                yield added
+            time.sleep(interval)
+
+    # Returns (token_reserve, eth_reserve, total_liquidity) after all events in `block` (default: the last indexed event).
+    # Raises LookupError if no event was indexed at or before `block`.
+    def reserves_at(self, block: int = None) -> Tuple[int, int, int]:
+        blocks = self.store.column('block')
+        row = len(blocks) - 1 if block is None else int(np.searchsorted(blocks, block, 'right')) - 1
+        if row < 0:
+            raise LookupError("no pool events at or before this block")
+        return tuple(_uint256(self.store.column(name)[row]) for name in ('token_reserve', 'eth_reserve', 'total_liquidity'))
+
+    # The whole history as numpy arrays: `block`, `log_index` and `kind`, plus the reserves and supply as float64
+    # (convenient for charts; use `reserves_at` for exact values) and the ETH-per-token `price`.
+    def series(self) -> Dict[str, np.ndarray]:
+        def as_float(name):
+            return np.array([float(_uint256(row)) for row in self.store.column(name)], dtype=np.float64)
+
+        token_reserve, eth_reserve = as_float('token_reserve'), as_float('eth_reserve')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price = eth_reserve / token_reserve
+        return {
+            'block': np.asarray(self.store.column('block')),
+            'log_index': np.asarray(self.store.column('log_index')),
+            'kind': np.asarray(self.store.column('kind')),
+            'token_reserve': token_reserve,
+            'eth_reserve': eth_reserve,
+            'total_liquidity': as_float('total_liquidity'),
+            'price': price,
+        }
@@ -0,0 +1,212 @@
+import random
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+from eth_hash.auto import keccak
+from brownie import RUToken, accounts, chain, web3
+
+from scripts.multisig_token import NonceManager, generate_managed_nonce_and_second_signature_transfer2of3
+from scripts.token_views import CHUNK_SIZE
+
+# Load generator for RUToken: `brownie run load_test` deploys a token on the local ganache, funds a set of
+# deterministic accounts and reports the sustained throughput; `LoadTest` can also be used from the console
+# (or a test) against an already deployed token.
+#
+# Transactions are signed locally and sent with eth_sendRawTransaction from several threads. Each thread owns a
+# disjoint share of the accounts (and the multisig address formed by the first three of them), so the account
+# nonces and the transfer2of3 nonces are tracked on the client without cross-thread ordering problems.
+
+# Relative weights of the operation types. Each `transferFrom` is preceded by the `approve` it spends,
+# which is reported as an operation of its own.
+DEFAULT_MIX = {'transfer': 50, 'transferFrom': 20, 'mint': 10, 'burn': 10, 'transfer2of3': 10}
+GAS_LIMIT = 300000 # Fixed gas limit, so sending a transaction needs no eth_estimateGas round trip
+RECEIPT_TIMEOUT = 120
+
+
+# Returns `count` accounts with deterministic keys (like `localaccounts` in tests/test_multisig.py, but any number).
+def load_accounts(count: int, seed: bytes = b'ru-load-test') -> list:
+    return [accounts.add(private_key=keccak(seed + i.to_bytes(4, 'big'))) for i in range(count)]
+
+
+class TransactionSender:
+    """
+    Signs and sends raw transactions, keeping the next nonce of every sending account locally instead of asking
+    the node for it each time. Nonces are handed out atomically, so one sender can be shared by threads.
+    """
+    def __init__(self, gas_price: int = None) -> None:
+        self.chain_id = chain.id
+        self.gas_price = web3.eth.gas_price if gas_price is None else gas_price
+        self._lock = threading.Lock()
+        self._nonces = {} # address -> next nonce
+
+    def _reserve(self, address: str) -> int:
+        with self._lock:
+            if address not in self._nonces:
+                self._nonces[address] = web3.eth.get_transaction_count(address)
+            nonce = self._nonces[address]
+            self._nonces[address] += 1
+            return nonce
+
+    # Reloads the nonce of `address` from the node, e.g. after the node rejected a transaction.
+    def resync(self, address: str) -> None:
+        with self._lock:
+            self._nonces[address] = web3.eth.get_transaction_count(address, 'pending')
+
+    # Sends `data` to `to` from `account` and waits for the receipt.
+    # Returns (latency in seconds, gas used, success). A transaction the node rejects or that reverts is unsuccessful.
+    def send(self, account, to: str, data: str, value: int = 0) -> tuple:
+        tx = {
+            'to': to, 'data': data, 'value': value, 'gas': GAS_LIMIT, 'gasPrice': self.gas_price,
+            'nonce': self._reserve(account.address), 'chainId': self.chain_id,
+        }
+        signed = web3.eth.account.sign_transaction(tx, account.private_key)
+        start = time.perf_counter()
+        try:
+            tx_hash = web3.eth.send_raw_transaction(signed.rawTransaction)
+            receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=RECEIPT_TIMEOUT)
+        except ValueError: # ganache reports reverts (and rejected transactions) as RPC errors
+            latency = time.perf_counter() - start
+            self.resync(account.address)
+            return (latency, 0, False)
+        return (time.perf_counter() - start, receipt['gasUsed'], receipt['status'] == 1)
+
+
+class LoadTest:
+    """
+    Drives a configurable mix of RUToken operations (`mix` maps operation names from DEFAULT_MIX to weights)
+    from `threads` threads, spreading the work over `load_accounts`.
+    Call `setup` once to fund the accounts and register the multisig addresses, then `run` as often as needed.
+    """
+    def __init__(self, tok: RUToken, load_accounts: list, mix: Dict[str, int] = None, threads: int = 4,
+                 amount: int = 1, seed: int = 0, gas_price: int = None) -> None:
+        self.tok = tok
+        self.accounts = list(load_accounts)
+        self.mix = dict(DEFAULT_MIX if mix is None else mix)
+        unknown = set(self.mix) - set(DEFAULT_MIX)
+        if unknown:
+            raise ValueError(f"unknown operations: {sorted(unknown)}")
+        if len(self.accounts) < 3 * threads:
+            raise ValueError("need at least three load accounts per thread")
+        self.threads = threads
+        self.amount = amount
+        self.seed = seed
+        self.gas_price = gas_price
+
+        self.shares = [self.accounts[i::threads] for i in range(threads)]
+        self.multisigs = [None] * threads
+        self.nonces = NonceManager(tok)
+        self.sender = None
+
+    # Gives every load account `eth_each` wei (for gas and minting) and `tokens_each` tokens, and registers
+    # and funds the multisig address of each thread's first three accounts.
+    def setup(self, funder, tokens_each: int = 1000, eth_each: int = 10**18) -> None:
+        for account in self.accounts:
+            if account.balance() < eth_each:
+                funder.transfer(account, eth_each - account.balance())
+
+        for i, share in enumerate(self.shares):
+            self.multisigs[i] = self.nonces.register(share[0], share[1], share[2], {'from': funder})
+
+        recipients = self.accounts + self.multisigs
+        self.tok.mint({'from': funder, 'value': tokens_each * len(recipients) * self.tok.tokenPrice()})
+        for i in range(0, len(recipients), CHUNK_SIZE):
+            chunk = recipients[i:i + CHUNK_SIZE]
+            self.tok.batchTransfer(chunk, [tokens_each] * len(chunk), {'from': funder})
+
+        self.sender = TransactionSender(self.gas_price)
+
+    # Performs `operations` operations drawn from the mix, split evenly between the threads.
+    # Returns a report (see `summarize`).
+    def run(self, operations: int) -> dict:
+        if self.sender is None:
+            raise RuntimeError("call setup() first")
+        samples = [{} for _ in range(self.threads)]
+        threads = [
+            threading.Thread(target=self._work, args=(i, operations // self.threads + (i < operations % self.threads), samples[i]))
+            for i in range(self.threads)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+        merged = {}
+        for thread_samples in samples:
+            for name, values in thread_samples.items():
+                merged.setdefault(name, []).extend(values)
+        return summarize(merged, duration)
+
+    def _work(self, index: int, operations: int, samples: Dict[str, List[tuple]]) -> None:
+        rng = random.Random(self.seed * 1000003 + index)
+        share, multisig = self.shares[index], self.multisigs[index]
+        names, weights = list(self.mix), list(self.mix.values())
+        tok, amount, price = self.tok, self.amount, self.tok.tokenPrice()
+
+        def send(name, account, data, value=0):
+            sample = self.sender.send(account, tok.address, data, value)
+            samples.setdefault(name, []).append(sample)
+            return sample[2]
+
+        for _ in range(operations):
+            name = rng.choices(names, weights)[0]
+            account = rng.choice(share)
+            recipient = rng.choice(self.accounts)
+            if name == 'transfer':
+                send(name, account, tok.transfer.encode_input(recipient, amount))
+            elif name == 'transferFrom':
+                spender = rng.choice([other for other in share if other != account])
+                if send('approve', account, tok.approve.encode_input(spender, amount)):
+                    send(name, spender, tok.transferFrom.encode_input(account, recipient, amount))
+            elif name == 'mint':
+                send(name, account, tok.mint.encode_input(), amount * price)
+            elif name == 'burn':
+                send(name, account, tok.burn.encode_input(amount))
+            elif name == 'transfer2of3':
+                nonce, sig = generate_managed_nonce_and_second_signature_transfer2of3(self.nonces, share[1].private_key, multisig, recipient, amount)
+                if send(name, share[0], tok.transfer2of3.encode_input(multisig, recipient, amount, nonce, sig.encoded())):
+                    self.nonces.confirm(multisig, nonce)
+                else:
+                    self.nonces.rollback(multisig, nonce)
+
+
+# Aggregates (latency, gas used, success) samples per operation type into counts, throughput,
+# latency percentiles (in milliseconds) and mean gas of the successful transactions.
+def summarize(samples: Dict[str, List[tuple]], duration: float) -> dict:
+    report = {'duration': duration, 'transactions': 0, 'failed': 0, 'tps': 0.0, 'operations': {}}
+    for name, values in sorted(samples.items()):
+        latencies = np.array([latency for latency, _, _ in values]) * 1000
+        gas = np.array([gas for _, gas, ok in values if ok])
+        failed = sum(1 for _, _, ok in values if not ok)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        report['operations'][name] = {
+            'count': len(values),
+            'failed': failed,
+            'tps': (len(values) - failed) / duration if duration else 0.0,
+            'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99),
+            'mean_gas': float(gas.mean()) if len(gas) else 0.0,
+        }
+        report['transactions'] += len(values)
+        report['failed'] += failed
+    if duration:
+        report['tps'] = (report['transactions'] - report['failed']) / duration
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['transactions']} transactions ({report['failed']} failed) in {report['duration']:.2f}s: {report['tps']:.1f} tx/s")
+    print(f"{'operation':<14}{'count':>8}{'failed':>8}{'tx/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'gas':>9}")
+    for name, stats in report['operations'].items():
+        print(f"{name:<14}{stats['count']:>8}{stats['failed']:>8}{stats['tps']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['mean_gas']:>9.0f}")
+
+
+def main():
+    funder = accounts[0]
+    tok = RUToken.deploy(100, 10**12, {'from': funder})
+    test = LoadTest(tok, load_accounts(24), threads=8)
+    test.setup(funder)
+    print_report(test.run(2000))
@@ -1,6 +1,15 @@
-from typing import Tuple
+import dbm
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
 from eth_keys import KeyAPI # note had issues with eth_keys module in PyCharm
-from eth_keys.backends import NativeECCBackend
+from eth_keys.backends import CoinCurveECCBackend, NativeECCBackend
+from eth_hash.auto import keccak
+from eth_utils import to_checksum_address
 from brownie import RUToken
 from web3 import Web3 # help with hashing
 
@@ -32,12 +41,516 @@ def generate_nonce_and_second_signature_transfer2of3(tok: RUToken, sk, multisigA
     # Structured to prevent replay attacks
     nonce += 1
 
+    multi_signature = sign_transfer2of3(tok.address, key, multisigAddr, spender, amount, nonce)
+    
+    return (nonce, multi_signature)  # return (0, Signature(b'\0', b'\0', 0)) # Change this!
+
+
+# Accepts either a brownie account/contract or a plain address string.
+def _to_address(account) -> str:
+    return getattr(account, 'address', account)
+
+
+# Returns the checksummed address of `account`, so that any spelling of an address gives the same dict key.
+def _checksum_address(account) -> str:
+    return to_checksum_address(_to_address(account))
+
+
+# Returns the multisig address of the keys `pk1`, `pk2` and `pk3` without an RPC call.
+# Matches address(uint160(uint256(keccak256(abi.encodePacked(pk1, pk2, pk3))))) in `getMultisigAddress`.
+def multisig_address(pk1, pk2, pk3) -> str:
+    return to_checksum_address(keccak(_address_bytes(_to_address(pk1)) + _address_bytes(_to_address(pk2)) + _address_bytes(_to_address(pk3)))[12:])
+
+
+# Bulk version of `multisig_address` for a list of (pk1, pk2, pk3) triples: the packed keys of all triples are
+# laid out in one buffer and hashed slice by slice. With `checksum=False` the raw 20-byte addresses are returned,
+# which saves the second hash that checksumming costs.
+def multisig_addresses_of(triples: Iterable[Tuple], checksum: bool = True) -> List:
+    triples = list(triples)
+    packed = b''.join(_address_bytes(_to_address(pk)) for triple in triples for pk in triple)
+    addresses = [keccak(packed[offset:offset + 60])[12:] for offset in range(0, len(packed), 60)]
+    return [to_checksum_address(address) for address in addresses] if checksum else addresses
+
+
+class MultisigDirectory:
+    """
+    Persistent table from multisig address to its three keys, stored in a `dbm` database at `path`
+    (20-byte address -> 60 packed key bytes), so an address can be mapped back to its keys without the chain.
+    Safe to share between threads.
+    """
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._db = dbm.open(path, 'c')
+
+    # Stores the keys of a multisig address and returns the address.
+    def add(self, pk1, pk2, pk3) -> str:
+        return self.add_many([(pk1, pk2, pk3)])[0]
+
+    # Stores the keys of many multisig addresses (computed by `multisig_addresses_of`) and returns the addresses.
+    def add_many(self, triples: Iterable[Tuple]) -> List[str]:
+        triples = list(triples)
+        addresses = multisig_addresses_of(triples, checksum=False)
+        with self._lock:
+            for address, triple in zip(addresses, triples):
+                self._db[address] = b''.join(_address_bytes(_to_address(pk)) for pk in triple)
+        return [to_checksum_address(address) for address in addresses]
+
+    # Returns (pk1, pk2, pk3) of a multisig address. Raises KeyError if the address was never added.
+    def keys_of(self, multisigAddr) -> Tuple[str, str, str]:
+        with self._lock:
+            packed = self._db[_address_bytes(_to_address(multisigAddr))]
+        return tuple(to_checksum_address(packed[i:i + 20]) for i in range(0, 60, 20))
+
+    def __contains__(self, multisigAddr) -> bool:
+        with self._lock:
+            return _address_bytes(_to_address(multisigAddr)) in self._db
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._db)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> 'MultisigDirectory':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Signs the message checked by `transfer2of3` for an explicit nonce.
+# Matches keccak256(abi.encodePacked(address(this), recipient, multisigOwner, amount, nonce)) in RUToken.
+def sign_transfer2of3(tok_address, key, multisigAddr, spender, amount, nonce) -> Signature:
     # hashing the message
     message_hash = Web3.solidityKeccak(['address', 'address', 'address', 'uint256', 'uint256']
-                                       , [tok.address, spender.address, multisigAddr.address, amount, nonce])
+                                       , [tok_address, _to_address(spender), _to_address(multisigAddr), amount, nonce])
+
+    return sign_digest(key, message_hash)
 
+
+# Signs an already hashed message.
+def sign_digest(key, message_hash: bytes) -> Signature:
     message_signed = keys.ecdsa_sign(message_hash, key)
-    multi_signature = Signature(message_signed.r, message_signed.s, message_signed.v)
-    
-    return (nonce, multi_signature)  # return (0, Signature(b'\0', b'\0', 0)) # Change this!
-    
+    return Signature(message_signed.r, message_signed.s, message_signed.v)
+
+
+@lru_cache(maxsize=4096)
+def _address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:])
+
+
+class Transfer2of3Digest:
+    """
+    Computes transfer2of3 message hashes for one token contract and one multisig address.
+    The packed preimage (token, recipient, multisig, amount, nonce) is kept in a preallocated buffer,
+    so only the recipient, amount and nonce bytes are rewritten for each digest.
+    Instances are not thread-safe; use one per thread.
+    """
+    # Offsets into abi.encodePacked(address(this), recipient, multisigOwner, amount, nonce)
+    RECIPIENT = slice(20, 40)
+    AMOUNT = slice(60, 92)
+    NONCE = slice(92, 124)
+    SIZE = 124
+
+    def __init__(self, tok_address, multisigAddr) -> None:
+        self._buf = bytearray(self.SIZE)
+        self._buf[0:20] = _address_bytes(_to_address(tok_address))
+        self._buf[40:60] = _address_bytes(_to_address(multisigAddr))
+
+    def digest(self, spender, amount: int, nonce: int) -> bytes:
+        buf = self._buf
+        buf[self.RECIPIENT] = _address_bytes(_to_address(spender))
+        buf[self.AMOUNT] = amount.to_bytes(32, 'big')
+        buf[self.NONCE] = nonce.to_bytes(32, 'big')
+        return keccak(buf)
+
+    # Hashes a list of (spender, amount, nonce) legs. keccak has no batch API, so this is just `digest` in a loop
+    # over the shared template buffer.
+    def digest_many(self, legs: Iterable[Tuple]) -> List[bytes]:
+        return [self.digest(spender, amount, nonce) for spender, amount, nonce in legs]
+
+
+# Batch version of `generate_nonce_and_second_signature_transfer2of3`.
+# `jobs` is a list of (multisigAddr, spender, amount) tuples. The on-chain nonce of each distinct
+# multisig address is read once, and consecutive nonces are assigned locally in job order, so the
+# returned (nonce, signature) pairs must be submitted in the same order for each multisig address.
+# Like the single version, this function does not change state.
+def generate_nonces_and_second_signatures_transfer2of3(tok: RUToken, sk, jobs: Iterable[Tuple]) -> List[Tuple[int,Signature]]:
+    key = keys.PrivateKey(bytes.fromhex(sk[2:]))
+
+    last_nonces = {} # multisig address -> last nonce assigned
+    digests = {} # multisig address -> Transfer2of3Digest
+    signed = []
+    for multisigAddr, spender, amount in jobs:
+        multisig = _to_address(multisigAddr)
+        if multisig not in last_nonces:
+            last_nonces[multisig] = tok.nonce(multisig)
+            digests[multisig] = Transfer2of3Digest(tok.address, multisig)
+        last_nonces[multisig] += 1
+
+        nonce = last_nonces[multisig]
+        signed.append((nonce, sign_digest(key, digests[multisig].digest(spender, amount, nonce))))
+
+    return signed
+
+
+# Message hash checked by `transfer2of3Batch` for the (spender, amount) `legs`:
+# keccak256(abi.encodePacked(address(this), multisigOwner, nonce, keccak256(abi.encodePacked(recipients)), keccak256(abi.encodePacked(amounts))))
+def transfer2of3_batch_digest(tok_address, multisigAddr, legs: Iterable[Tuple], nonce: int) -> bytes:
+    legs = list(legs)
+    recipients_hash = keccak(b''.join(bytes(12) + _address_bytes(_to_address(spender)) for spender, _ in legs)) # array elements are padded to 32 bytes
+    amounts_hash = keccak(b''.join(amount.to_bytes(32, 'big') for _, amount in legs))
+    return keccak(_address_bytes(_to_address(tok_address)) + _address_bytes(_to_address(multisigAddr)) + nonce.to_bytes(32, 'big') + recipients_hash + amounts_hash)
+
+
+# Returns the nonce and signature to pass to `transfer2of3Batch` for a list of (spender, amount) legs.
+# Like `generate_nonce_and_second_signature_transfer2of3`, this function does not change state.
+def generate_nonce_and_second_signature_transfer2of3_batch(tok: RUToken, sk, multisigAddr, legs: Iterable[Tuple]) -> Tuple[int,Signature]:
+    key = keys.PrivateKey(bytes.fromhex(sk[2:]))
+    nonce = tok.nonce(multisigAddr) + 1
+    return (nonce, sign_digest(key, transfer2of3_batch_digest(tok.address, multisigAddr, legs, nonce)))
+
+
+class NonceManager:
+    """
+    Local cache of the transfer2of3 nonces of multisig addresses, so signing does not need a `tok.nonce` call each time.
+    Nonces are handed out atomically, so one manager can be shared by signer threads (or coroutines).
+    Every nonce handed out stays outstanding until it is mined (`confirm`, or seen on chain by `resync`) or given back
+    (`rollback`), and an outstanding nonce is never handed out again.
+    If a transaction using a reserved nonce is never sent, or it reverts, give the nonce back with `rollback`: it is
+    handed out again before any new nonce, so the transfers already signed with later nonces stay valid.
+    """
+    def __init__(self, tok: RUToken) -> None:
+        self.tok = tok
+        self._lock = threading.Lock()
+        self._last = {} # multisig address -> last nonce used on chain or handed out
+        self._outstanding = {} # multisig address -> nonces handed out and not known to be mined
+        self._free = {} # multisig address -> nonces below the last one that were given back, to be handed out first
+
+    # Registers a multisig address on chain and starts tracking it (registerMultisigAddress sets its nonce to 1).
+    def register(self, pk1, pk2, pk3, tx_params: dict) -> str:
+        tx = self.tok.registerMultisigAddress(pk1, pk2, pk3, tx_params)
+        multisig = _checksum_address(tx.return_value)
+        with self._lock:
+            self._last[multisig] = 1
+            self._outstanding[multisig] = set()
+            self._free[multisig] = set()
+        return multisig
+
+    # Starts tracking an already registered multisig address (a no-op if it is already tracked).
+    def track(self, multisigAddr) -> None:
+        multisig = _checksum_address(multisigAddr)
+        with self._lock:
+            if multisig in self._last:
+                return
+        onchain = self.tok.nonce(multisig)
+        with self._lock:
+            if multisig not in self._last:
+                self._last[multisig] = onchain
+                self._outstanding[multisig] = set()
+                self._free[multisig] = set()
+
+    # Returns the lowest nonce of `multisigAddr` that is neither used on chain nor outstanding.
+    def reserve(self, multisigAddr) -> int:
+        multisig = _checksum_address(multisigAddr)
+        self.track(multisig)
+        with self._lock:
+            free = self._free[multisig]
+            if free:
+                nonce = min(free)
+                free.remove(nonce)
+            else:
+                self._last[multisig] += 1
+                nonce = self._last[multisig]
+            self._outstanding[multisig].add(nonce)
+            return nonce
+
+    # Records that the transaction using `nonce` was mined.
+    def confirm(self, multisigAddr, nonce: int) -> None:
+        with self._lock:
+            self._outstanding.get(_checksum_address(multisigAddr), set()).discard(nonce)
+
+    # Gives back a reserved nonce that will not be used (or whose transaction reverted).
+    def rollback(self, multisigAddr, nonce: int) -> None:
+        multisig = _checksum_address(multisigAddr)
+        with self._lock:
+            if nonce not in self._outstanding.get(multisig, ()):
+                return
+            self._outstanding[multisig].remove(nonce)
+            free = self._free[multisig]
+            free.add(nonce)
+            while self._last[multisig] in free: # Trailing free nonces are simply not handed out yet
+                free.remove(self._last[multisig])
+                self._last[multisig] -= 1
+
+    # Reloads the on-chain nonce, e.g. after transfers were sent by another client. Outstanding nonces the chain
+    # has passed are taken as mined; the others are kept, so the last nonce becomes the higher of the on-chain nonce
+    # and the highest outstanding one, and any nonces in between that are not outstanding are handed out again.
+    def resync(self, multisigAddr) -> int:
+        multisig = _checksum_address(multisigAddr)
+        self.track(multisig)
+        onchain = self.tok.nonce(multisig)
+        with self._lock:
+            outstanding = {nonce for nonce in self._outstanding[multisig] if nonce > onchain}
+            last = max(outstanding, default=onchain)
+            self._outstanding[multisig] = outstanding
+            self._last[multisig] = last
+            self._free[multisig] = set(range(onchain + 1, last + 1)) - outstanding
+        return onchain
+
+
+# Like `generate_nonce_and_second_signature_transfer2of3`, but takes the nonce from a `NonceManager` instead of the chain.
+def generate_managed_nonce_and_second_signature_transfer2of3(nonces: NonceManager, sk, multisigAddr, spender, amount) -> Tuple[int,Signature]:
+    key = keys.PrivateKey(bytes.fromhex(sk[2:]))
+    nonce = nonces.reserve(multisigAddr)
+    return (nonce, sign_transfer2of3(nonces.tok.address, key, multisigAddr, spender, amount, nonce))
+
+
+# Signs the message checked by `transfer2of3Unordered`.
+# Matches keccak256(abi.encodePacked("transfer2of3Unordered", address(this), recipient, multisigOwner, amount, nonce)) in RUToken.
+def sign_transfer2of3_unordered(tok_address, key, multisigAddr, spender, amount, nonce) -> Signature:
+    message_hash = Web3.solidityKeccak(['string', 'address', 'address', 'address', 'uint256', 'uint256']
+                                       , ['transfer2of3Unordered', tok_address, _to_address(spender), _to_address(multisigAddr), amount, nonce])
+    return sign_digest(key, message_hash)
+
+
+class UnorderedNonceAllocator:
+    """
+    Hands out unused `transfer2of3Unordered` nonces of multisig addresses. The on-chain bitmap (`nonceBitmap`) is read
+    one 256-nonce word at a time and kept locally, together with the nonces handed out but not mined yet, so
+    concurrent signers sharing an allocator never get the same nonce and rarely need an RPC call.
+    Transfers signed with these nonces can be submitted in any order. If one is never sent or reverts,
+    give its nonce back with `release` (a reverted transfer doesn't use its nonce).
+    Independent clients that don't share an allocator should use disjoint word ranges (`first_word`),
+    e.g. the index of their key shifted left by 32, so they don't pick the same nonces.
+    """
+    FULL_WORD = (1 << 256) - 1
+
+    def __init__(self, tok: RUToken, first_word: int = 0) -> None:
+        self.tok = tok
+        self.first_word = first_word
+        self._lock = threading.Lock()
+        self._words = {} # multisig address -> {word position -> bitmap of nonces used on chain or handed out}
+        self._next_word = {} # multisig address -> first word position that may have unused nonces
+
+    def _word(self, multisig: str, word_pos: int) -> int:
+        words = self._words.setdefault(multisig, {})
+        if word_pos not in words:
+            words[word_pos] = self.tok.nonceBitmap(multisig, word_pos)
+        return words[word_pos]
+
+    # Returns an unused nonce for `multisigAddr`, the lowest one available from `first_word` on.
+    def reserve(self, multisigAddr) -> int:
+        multisig = _to_address(multisigAddr)
+        with self._lock:
+            word_pos = self._next_word.get(multisig, self.first_word)
+            while self._word(multisig, word_pos) == self.FULL_WORD:
+                word_pos += 1
+            bitmap = self._words[multisig][word_pos]
+            bit = (~bitmap & (bitmap + 1)).bit_length() - 1 # Lowest clear bit
+            self._words[multisig][word_pos] = bitmap | (1 << bit)
+            self._next_word[multisig] = word_pos
+            return (word_pos << 8) | bit
+
+    # Gives back a reserved nonce whose transfer was never mined, so it can be handed out again.
+    def release(self, multisigAddr, nonce: int) -> None:
+        multisig = _to_address(multisigAddr)
+        word_pos, bit = nonce >> 8, nonce & 0xff
+        with self._lock:
+            words = self._words.get(multisig, {})
+            if word_pos in words:
+                words[word_pos] &= ~(1 << bit)
+                if word_pos >= self.first_word:
+                    self._next_word[multisig] = min(self._next_word.get(multisig, word_pos), word_pos)
+
+    # Merges the on-chain bitmap words into the local ones, e.g. to see nonces used by other clients or invalidated.
+    def sync(self, multisigAddr) -> None:
+        multisig = _to_address(multisigAddr)
+        with self._lock:
+            positions = list(self._words.get(multisig, {}))
+        onchain = {word_pos: self.tok.nonceBitmap(multisig, word_pos) for word_pos in positions}
+        with self._lock:
+            words = self._words[multisig]
+            for word_pos, bitmap in onchain.items():
+                words[word_pos] |= bitmap
+
+
+# Like `generate_managed_nonce_and_second_signature_transfer2of3`, but for `transfer2of3Unordered`:
+# the nonce comes from an `UnorderedNonceAllocator`, and the transfers can be submitted in any order.
+def generate_unordered_nonce_and_second_signature_transfer2of3(nonces: UnorderedNonceAllocator, sk, multisigAddr, spender, amount) -> Tuple[int,Signature]:
+    key = keys.PrivateKey(bytes.fromhex(sk[2:]))
+    nonce = nonces.reserve(multisigAddr)
+    return (nonce, sign_transfer2of3_unordered(nonces.tok.address, key, multisigAddr, spender, amount, nonce))
+
+
+def _recover_signer(message_hash: bytes, r: int, s: int, v: int):
+    try:
+        return keys.ecdsa_recover(message_hash, keys.Signature(vrs=(v, r, s))).to_checksum_address()
+    except Exception: # eth_keys raises BadSignature or ValidationError for malformed signatures
+        return None
+
+
+def _as_int(value) -> int:
+    return int.from_bytes(value, 'big') if isinstance(value, (bytes, bytearray)) else int(value)
+
+
+class Transfer2of3Validator:
+    """
+    Client-side pre-check of transfer2of3 requests, so a bad co-signature is rejected before it costs an RPC round
+    trip and gas. It repeats the checks of `transfer2of3` against a local copy of each multisig's three keys
+    (added with `add`, or looked up in a `MultisigDirectory`, since the token has no getter for them) and of its
+    on-chain nonce. Signers recovered from (digest, signature) pairs are kept in an LRU cache of `cache_size` entries.
+    Safe to share between threads.
+    """
+    def __init__(self, tok: RUToken, cache_size: int = 4096, directory: 'MultisigDirectory' = None) -> None:
+        self.tok = tok
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._keys = {} # multisig address -> (pk1, pk2, pk3)
+        self._nonces = {} # multisig address -> last nonce used on chain
+        self._recover = lru_cache(maxsize=cache_size)(_recover_signer)
+
+    # Adds the keys of a multisig address (which must also be registered on chain) and returns the address.
+    def add(self, pk1, pk2, pk3) -> str:
+        keys_ = tuple(to_checksum_address(_to_address(pk)) for pk in (pk1, pk2, pk3))
+        multisig = multisig_address(*keys_)
+        with self._lock:
+            self._keys[multisig] = keys_
+        return multisig
+
+    def _keys_of(self, multisig: str):
+        multisig_keys = self._keys.get(multisig)
+        if multisig_keys is None and self.directory is not None and multisig in self.directory:
+            multisig_keys = self.directory.keys_of(multisig)
+            with self._lock:
+                self._keys[multisig] = multisig_keys
+        return multisig_keys
+
+    def _nonce(self, multisig: str) -> int:
+        if multisig not in self._nonces:
+            onchain = self.tok.nonce(multisig)
+            with self._lock:
+                self._nonces.setdefault(multisig, onchain)
+        return self._nonces[multisig]
+
+    # Reloads the on-chain nonce, e.g. after a transfer2of3 transaction reverted.
+    def resync(self, multisigAddr) -> int:
+        multisig = _to_address(multisigAddr)
+        onchain = self.tok.nonce(multisig)
+        with self._lock:
+            self._nonces[multisig] = onchain
+        return onchain
+
+    # Records that `nonce` was used by a transfer2of3 transaction sent for `multisigAddr`.
+    def record(self, multisigAddr, nonce: int) -> None:
+        with self._lock:
+            self._nonces[_to_address(multisigAddr)] = nonce
+
+    # Returns the address that produced `sig` over `message_hash`, or None if the signature is malformed.
+    def recover(self, message_hash: bytes, sig: Signature):
+        return self._recover(bytes(message_hash), _as_int(sig.r), _as_int(sig.s), sig.v)
+
+    def cache_info(self):
+        return self._recover.cache_info()
+
+    # Raises ValueError (with the reason) if `transfer2of3(multisigAddr, spender, amount, nonce, sig)` sent by `sender`
+    # would revert on the multisig checks. Returns the recovered co-signer otherwise.
+    # A nonce that doesn't follow the cached one is only rejected after the on-chain nonce was reloaded.
+    def check(self, sender, multisigAddr, spender, amount: int, nonce: int, sig: Signature) -> str:
+        multisig = to_checksum_address(_to_address(multisigAddr))
+        multisig_keys = self._keys_of(multisig)
+        if multisig_keys is None:
+            raise ValueError(f"unknown multisig address {multisig}")
+        expected = self._nonce(multisig) + 1
+        if nonce != expected:
+            # The cached nonce is stale if another signer advanced the multisig since it was read: reload it once
+            expected = self.resync(multisig) + 1
+            if nonce != expected:
+                raise ValueError(f"wrong nonce {nonce}, expected {expected}")
+        if int(_to_address(spender), 16) == 0:
+            raise ValueError("recipient is the zero address")
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+
+        signer = self.recover(Transfer2of3Digest(self.tok.address, multisig).digest(spender, amount, nonce), sig)
+        sender = to_checksum_address(_to_address(sender))
+        if signer is None:
+            raise ValueError("malformed co-signature")
+        if signer == sender:
+            raise ValueError("co-signer is the sender")
+        if sender not in multisig_keys:
+            raise ValueError(f"sender {sender} is not one of the multisig keys")
+        if signer not in multisig_keys:
+            raise ValueError(f"co-signer {signer} is not one of the multisig keys")
+        return signer
+
+    # Checks a transfer2of3 request and, if it passes, sends it from `sender` (a brownie account).
+    # Keeps the cached nonce in step with the chain: advanced on success, reloaded if the transaction reverts anyway.
+    def transfer2of3(self, sender, multisigAddr, spender, amount: int, nonce: int, sig: Signature):
+        self.check(sender, multisigAddr, spender, amount, nonce, sig)
+        try:
+            tx = self.tok.transfer2of3(multisigAddr, spender, amount, nonce, sig.encoded(), {'from': sender})
+        except Exception:
+            self.resync(multisigAddr)
+            raise
+        self.record(multisigAddr, nonce)
+        return tx
+
+# Per-process signing state used by `ParallelSigner` workers (set up once per worker by `_init_signing_worker`).
+_worker_keys = None
+_worker_key = None
+
+def _init_signing_worker(sk, use_coincurve: bool) -> None:
+    global _worker_keys, _worker_key
+    _worker_keys = KeyAPI(CoinCurveECCBackend if use_coincurve else NativeECCBackend)
+    _worker_key = _worker_keys.PrivateKey(bytes.fromhex(sk[2:]))
+
+def _sign_in_worker(message_hash: bytes) -> Tuple[int, int, int]:
+    message_signed = _worker_keys.ecdsa_sign(message_hash, _worker_key)
+    return (message_signed.r, message_signed.s, message_signed.v)
+
+
+class ParallelSigner:
+    """
+    Signs message hashes (e.g. transfer2of3 digests) with a single secret key, spread over a pool of worker processes.
+    Signatures are returned in the same order as the input hashes.
+    The input is read in windows of `window` hashes (by default four chunks per worker), so a long stream of hashes
+    is never held in memory at once: a window is signed before the next one is read.
+    Set `use_coincurve` to sign with the (much faster) libsecp256k1-based backend; it requires the `coincurve` package.
+    """
+    def __init__(self, sk, processes: int = None, use_coincurve: bool = False, chunksize: int = 64, window: int = None) -> None:
+        self.chunksize = chunksize
+        self.window = chunksize * 4 * (processes or os.cpu_count() or 1) if window is None else window
+        self.signed = 0 # Total number of signatures produced
+        self.elapsed = 0.0 # Total seconds spent in `sign`
+        self._pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_signing_worker, initargs=(sk, use_coincurve))
+
+    def sign(self, message_hashes: Iterable[bytes]) -> List[Signature]:
+        return list(self.sign_stream(message_hashes))
+
+    # Yields the signatures of `message_hashes` in order, one window at a time.
+    def sign_stream(self, message_hashes: Iterable[bytes]) -> Iterator[Signature]:
+        message_hashes = iter(message_hashes)
+        while True:
+            window = list(islice(message_hashes, self.window))
+            if not window:
+                return
+            start = time.perf_counter()
+            signatures = [Signature(r, s, v) for r, s, v in self._pool.map(_sign_in_worker, window, chunksize=self.chunksize)]
+            self.elapsed += time.perf_counter() - start
+            self.signed += len(signatures)
+            yield from signatures
+
+    # Throughput over all calls to `sign` so far.
+    def signatures_per_second(self) -> float:
+        return self.signed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def close(self) -> None:
+        self._pool.shutdown()
+
+    def __enter__(self) -> 'ParallelSigner':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,47 @@
+from eth_hash.auto import keccak
+from brownie import RUToken
+
+from scripts.multisig_token import Signature, keys, sign_digest, _address_bytes, _to_address
+
+# Client side of the EIP-2612 `permit` of RUToken (see interfaces/IERC20Permit.sol): signs approvals off-chain,
+# so they can be submitted by anyone, e.g. together with the exchange call that spends them
+# (`initializeWithPermit`, `sellTokensWithPermit` and `mintLiquidityTokensWithPermit` in IExchange).
+
+PERMIT_TYPEHASH = keccak(b'Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)')
+DOMAIN_TYPEHASH = keccak(b'EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)')
+PERMIT_VERSION = '1' # Matches the version in RUToken's domain separator
+
+
+# abi.encode of static values: every value takes one 32-byte word.
+def _encode_words(*values) -> bytes:
+    return b''.join(
+        value.rjust(32, b'\0') if isinstance(value, bytes) else
+        value.to_bytes(32, 'big') if isinstance(value, int) else
+        _address_bytes(_to_address(value)).rjust(32, b'\0')
+        for value in values)
+
+
+# Matches `buildDomainSeparator` in RUToken.
+def domain_separator(name: str, version: str, chain_id: int, verifying_contract) -> bytes:
+    return keccak(_encode_words(DOMAIN_TYPEHASH, keccak(name.encode()), keccak(version.encode()), chain_id, verifying_contract))
+
+
+# The EIP-712 digest signed by the owner of the tokens. Matches the digest checked by `permit` in RUToken.
+def permit_digest(domain_separator: bytes, owner, spender, value: int, nonce: int, deadline: int) -> bytes:
+    struct_hash = keccak(_encode_words(PERMIT_TYPEHASH, owner, spender, value, nonce, deadline))
+    return keccak(b'\x19\x01' + domain_separator + struct_hash)
+
+
+# Signs a permit for `spender` to spend `value` of the tokens of the owner of `sk` until `deadline`.
+# Reads the owner's next permit nonce and the domain separator from `tok`, so it only calls `view` methods.
+def sign_permit(tok: RUToken, sk, spender, value: int, deadline: int) -> Signature:
+    key = keys.PrivateKey(bytes.fromhex(sk[2:]))
+    owner = key.public_key.to_checksum_address()
+    digest = permit_digest(bytes(tok.DOMAIN_SEPARATOR()), owner, spender, value, tok.nonces(owner), deadline)
+    return sign_digest(key, digest)
+
+
+# Arguments for `tok.permit` after (owner, spender, value, deadline): (v, r, s).
+def permit_args(sig: Signature) -> tuple:
+    r, s, v = sig.encoded()
+    return (v, r.to_bytes(32, 'big'), s.to_bytes(32, 'big'))
@@ -0,0 +1,39 @@
+from typing import Iterable, List, Tuple
+from brownie import RUToken
+
+# Number of addresses per view call. Each entry costs about one storage read,
+# so a chunk stays far below the gas cap the node applies to eth_call.
+CHUNK_SIZE = 250
+
+
+def _chunks(items: list, chunk_size: int):
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+# Returns the token balances of `accounts` (in the same order), using one `balanceOfBatch` call per chunk.
+def balances_of(tok: RUToken, accounts: Iterable, chunk_size: int = CHUNK_SIZE) -> List[int]:
+    accounts = list(accounts)
+    balances = []
+    for chunk in _chunks(accounts, chunk_size):
+        balances.extend(tok.balanceOfBatch(chunk))
+    return balances
+
+
+# Returns the allowances of the (owner, spender) `pairs` (in the same order), using one `allowanceBatch` call per chunk.
+def allowances_of(tok: RUToken, pairs: Iterable[Tuple], chunk_size: int = CHUNK_SIZE) -> List[int]:
+    pairs = list(pairs)
+    allowances = []
+    for chunk in _chunks(pairs, chunk_size):
+        owners, spenders = zip(*chunk)
+        allowances.extend(tok.allowanceBatch(list(owners), list(spenders)))
+    return allowances
+
+
+# Returns the transfer2of3 nonces of `multisig_addresses` (in the same order), using one `nonceBatch` call per chunk.
+def nonces_of(tok: RUToken, multisig_addresses: Iterable, chunk_size: int = CHUNK_SIZE) -> List[int]:
+    multisig_addresses = list(multisig_addresses)
+    nonces = []
+    for chunk in _chunks(multisig_addresses, chunk_size):
+        nonces.extend(tok.nonceBatch(chunk))
+    return nonces
@@ -0,0 +1,88 @@
+import pytest
+
+from brownie import chain, accounts
+
+from tests.test_tokens import deploy_ru_token, mint_ru_tokens, world_prices, world_maxtok
+from scripts.exchange import grade_exchange
+
+
+# Canonical world states, each deployed once per session (once per worker with `brownie test -n N`, each on its own
+# chain) by the first test that asks for it, so a module only pays for the worlds it uses:
+#  * `multisig_world`: an RUToken with tokens minted to accounts[1] and the eight multisig addresses of `localaccounts` registered
+#    (used by tests/test_multisig.py).
+#  * `exchange_token`: the RUToken traded by the exchange tests (used by tests/test_exchange.py).
+#  * `empty_ru_tokens`: RUTokens with nothing minted, by price (used by the hypothesis tests in tests/test_tokens.py).
+#  * `fresh_exchanges`: uninitialized RUExchanges, by deployer (used by the hypothesis tests in tests/test_exchange.py).
+#  * `ru_token_world`: an RUToken with tokens minted to accounts[1] (used by tests/test_gas.py).
+#  * `exchange_world`: an RUToken and an RUExchange initialized with the default fee and liquidity, when the exchange is graded
+#    (used by tests/test_gas.py and tests/test_exchange.py).
+#
+# Brownie's own `module_isolation` resets the chain to its launch state around every module, which would throw the
+# worlds away. It is overridden below to take a snapshot when a module starts and revert to it when the module ends
+# instead, so between tests the chain holds exactly the worlds built so far. `fn_isolation` snapshots before every test
+# and reverts after it, and `brownie.test.given` reverts to that snapshot before every hypothesis example, so every
+# test and example starts from the worlds too. A world first requested in the middle of a module is still kept: session
+# fixtures are set up before `fn_isolation` takes its snapshot, and every later snapshot includes it.
+#
+# All of this goes through brownie's single `chain.snapshot()` / `chain.revert()` slot, which relies on the chain
+# being back at the worlds whenever a snapshot is taken: module-scoped fixtures must not change chain state.
+
+
+@pytest.fixture(scope='session')
+def localaccounts():
+    return [accounts.add(private_key=bytes([i+1] * 32))  for i in range(10)]
+
+
+# Overrides brownie's fixture of the same name (see above); `fn_isolation` depends on it.
+@pytest.fixture(scope='module')
+def module_isolation():
+    chain.snapshot()
+    yield
+    chain.revert()
+
+
+@pytest.fixture(scope='session')
+def multisig_world(localaccounts):
+    from tests.test_multisig import deploy_and_mint, register_multisigs, price, maxtok, totalmint
+
+    tok = deploy_and_mint(price, maxtok, totalmint, accounts[1])
+    return tok, register_multisigs(tok, localaccounts)
+
+
+@pytest.fixture(scope='session')
+def exchange_token():
+    from tests.test_exchange import default_price, default_maxtok
+
+    return deploy_ru_token(default_price, default_maxtok, accounts[0])
+
+
+@pytest.fixture(scope='session')
+def empty_ru_tokens():
+    return {price: deploy_ru_token(price, world_maxtok, accounts[0]) for price in world_prices}
+
+
+@pytest.fixture(scope='session')
+def fresh_exchanges():
+    from tests.test_exchange import deploy_ru_exchange
+
+    return {account.address: deploy_ru_exchange(account) for account in accounts[0:2]}
+
+
+@pytest.fixture(scope='session')
+def ru_token_world():
+    tok = deploy_ru_token(100, 10000, accounts[0])
+    mint_ru_tokens(tok, accounts[1], 1000)
+    return tok
+
+
+@pytest.fixture(scope='session')
+def exchange_world():
+    from tests.test_exchange import default_price, default_maxtok, default_feepercent, default_initial_tokens, default_initial_eth
+    from tests.test_exchange import deploy_ru_exchange, initialize_ru_exchange
+
+    if not grade_exchange:
+        return None
+    tok = deploy_ru_token(default_price, default_maxtok, accounts[0])
+    exch = deploy_ru_exchange(accounts[0])
+    initialize_ru_exchange(exch, tok, accounts[0], default_feepercent, default_initial_tokens, default_initial_eth)
+    return tok, exch
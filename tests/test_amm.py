@@ -0,0 +1,203 @@
+from math import ceil
+import numpy as np
+import pytest
+from hypothesis import given, settings
+from hypothesis.strategies import integers, tuples
+
+from scripts.amm import ConstantProductPool, PriceObservation, Q112, cumulative_price_increments, from_uq112x112, quote_batch, quote_buy, quote_sell, twap
+from scripts.batch_orders import Order, build_batch
+from scripts.amm_vector import quote_buy_array, quote_sell_array
+
+
+# The selling example from the project README
+def test_sell_readme_example():
+    pool = ConstantProductPool(10, 99, 50, 10)
+    assert pool.sell(2) == (4, 5, 1)
+    assert (pool.token_reserve, pool.eth_reserve) == (12, 95)
+
+
+# The invariants TestExchangeSpecifics asserts against the deployed exchange, checked against the simulator alone
+# (same parameter ranges), so they run without a chain.
+
+fee_percents = integers(min_value=0, max_value=95)
+initial_eths = integers(min_value=10, max_value=300)
+# (amount, initial_tokens) with amount < initial_tokens
+smaller_amounts = tuples(integers(min_value=1, max_value=100), integers(min_value=2, max_value=100)).map(sorted).filter(lambda x: x[0] < x[1])
+any_amounts = tuples(integers(min_value=1, max_value=100), integers(min_value=1, max_value=100))
+
+
+# The pool's product without the fees deposited by the trade equals the initial one, up to rounding
+def check_k(initial_tokens, initial_eth, pool, eth_fee, token_fee):
+    orig_k = initial_tokens * initial_eth
+    tokens_without_fee = pool.token_reserve - token_fee
+    eth_without_fee = pool.eth_reserve - eth_fee
+    assert tokens_without_fee * (eth_without_fee - 1) <= orig_k <= tokens_without_fee * (eth_without_fee + 1)
+
+
+@given(feepercent=fee_percents, initial_eth=initial_eths, tokdata=smaller_amounts)
+@settings(max_examples=200)
+def test_simulated_buy(feepercent, initial_eth, tokdata):
+    buytokens, initial_tokens = tokdata
+    pool = ConstantProductPool(initial_tokens, initial_eth, feepercent, initial_tokens)
+    price, eth_fee, token_fee = pool.buy(buytokens)
+
+    exact_eth_fee = feepercent * price / 100
+    exact_token_fee = buytokens * feepercent / 100
+    assert int(exact_eth_fee) <= eth_fee <= ceil(exact_eth_fee)
+    assert int(exact_token_fee) <= token_fee <= ceil(exact_token_fee)
+    assert (pool.token_reserve, pool.eth_reserve) == (initial_tokens - buytokens + token_fee, initial_eth + price)
+    check_k(initial_tokens, initial_eth, pool, eth_fee, token_fee)
+
+
+@given(feepercent=fee_percents, initial_eth=initial_eths, tokdata=any_amounts)
+@settings(max_examples=200)
+def test_simulated_sell(feepercent, initial_eth, tokdata):
+    selltokens, initial_tokens = tokdata
+    pool = ConstantProductPool(initial_tokens, initial_eth, feepercent, initial_tokens)
+    value, eth_fee, token_fee = pool.sell(selltokens)
+
+    exact_eth_fee = feepercent * (value + eth_fee) / 100
+    exact_token_fee = selltokens * feepercent / 100
+    assert int(exact_eth_fee) <= eth_fee <= ceil(exact_eth_fee)
+    assert int(exact_token_fee) <= token_fee <= ceil(exact_token_fee)
+    assert (pool.token_reserve, pool.eth_reserve) == (initial_tokens + selltokens, initial_eth - value)
+    check_k(initial_tokens, initial_eth, pool, eth_fee, token_fee)
+
+
+@given(initial_eth=initial_eths, tokdata=any_amounts)
+@settings(max_examples=200)
+def test_simulated_mint_liquidity(initial_eth, tokdata):
+    minttokens, initial_tokens = tokdata
+    pool = ConstantProductPool(initial_tokens, initial_eth, 0, initial_tokens)
+    tokens, eth = pool.mint_liquidity(minttokens)
+
+    assert (pool.token_reserve, pool.eth_reserve, pool.total_liquidity) == (initial_tokens + tokens, initial_eth + eth, initial_tokens + minttokens)
+    fraction = minttokens / pool.total_liquidity
+    assert int(pool.token_reserve * fraction) <= tokens <= ceil(pool.token_reserve * fraction)
+    assert int(pool.eth_reserve * fraction) <= eth <= ceil(pool.eth_reserve * fraction)
+
+
+@given(initial_eth=initial_eths, tokdata=smaller_amounts)
+@settings(max_examples=200)
+def test_simulated_burn_liquidity(initial_eth, tokdata):
+    burntokens, initial_tokens = tokdata
+    pool = ConstantProductPool(initial_tokens, initial_eth, 0, initial_tokens)
+    tokens, eth = pool.burn_liquidity(burntokens)
+
+    assert (pool.token_reserve, pool.eth_reserve, pool.total_liquidity) == (initial_tokens - tokens, initial_eth - eth, initial_tokens - burntokens)
+    fraction = burntokens / initial_tokens
+    assert int(initial_tokens * fraction) <= tokens <= ceil(initial_tokens * fraction)
+    assert int(initial_eth * fraction) <= eth <= ceil(initial_eth * fraction)
+
+    with pytest.raises(ValueError):
+        pool.burn_liquidity(pool.total_liquidity + 1)
+
+
+# Like the exchange's quote views, the quotes reject an empty (uninitialized) pool
+def test_simulated_uninitialized_pool():
+    pool = ConstantProductPool(0, 0, 5, 0)
+    for quote in (pool.quote_buy, pool.quote_sell, pool.quote_mint_liquidity, pool.quote_burn_liquidity):
+        for amount in (0, 1):
+            with pytest.raises(ValueError):
+                quote(amount)
+    with pytest.raises(ValueError, match="not initialized"):
+        pool.quote_sell(1)
+
+
+# A round trip through the pool never pays out more than was put in
+@given(feepercent=fee_percents, initial_eth=initial_eths, tokdata=smaller_amounts)
+@settings(max_examples=200)
+def test_simulated_round_trip(feepercent, initial_eth, tokdata):
+    buytokens, initial_tokens = tokdata
+    pool = ConstantProductPool(initial_tokens, initial_eth, feepercent, initial_tokens)
+    price, _, token_fee = pool.buy(buytokens)
+    if buytokens > token_fee:
+        value, _, _ = pool.sell(buytokens - token_fee)
+        assert value <= price
+    assert pool.token_reserve >= initial_tokens and pool.eth_reserve >= initial_eth
+
+
+@pytest.mark.parametrize('dtype', [None, object])
+def test_vector_quotes_match_scalar(dtype):
+    token_reserve, eth_reserve = 1000, 5000
+    amounts = np.arange(0, token_reserve)
+    fees = np.array([0, 5, 50, 95])[:, None] # One row per fee setting
+
+    buy = quote_buy_array(token_reserve, eth_reserve, fees, amounts, dtype=dtype)
+    sell = quote_sell_array(token_reserve, eth_reserve, fees, amounts, dtype=dtype)
+
+    for i, fee in enumerate(fees[:, 0]):
+        for j in range(0, len(amounts), 37):
+            assert tuple(int(a[i, j]) for a in buy) == quote_buy(token_reserve, eth_reserve, int(fee), int(amounts[j]))
+            assert tuple(int(a[i, j]) for a in sell) == quote_sell(token_reserve, eth_reserve, int(fee), int(amounts[j]))
+
+
+def test_vector_quotes_overflow():
+    reserve = 10**30
+    price, eth_fee, token_fee = quote_buy_array(reserve, reserve, 3, [1, 10**20])
+    assert price.dtype == object
+    assert (price[1], eth_fee[1], token_fee[1]) == quote_buy(reserve, reserve, 3, 10**20)
+
+    with pytest.raises(OverflowError):
+        quote_buy_array(reserve, reserve, 3, [1], dtype=np.int64)
+
+
+# Accumulates the prices of a sequence of (token_reserve, eth_reserve, seconds) periods, as RUExchange would
+def accumulate(observation, periods):
+    for token_reserve, eth_reserve, seconds in periods:
+        token_increment, eth_increment = cumulative_price_increments(token_reserve, eth_reserve, seconds)
+        observation = PriceObservation((observation.token_price_cumulative + token_increment) % 2**256,
+                                       (observation.eth_price_cumulative + eth_increment) % 2**256,
+                                       (observation.timestamp + seconds) % 2**32)
+    return observation
+
+
+def test_twap():
+    periods = [(100, 200, 10), (50, 400, 30)] # ETH-per-token price 2 for 10s, then 8 for 30s
+    start = PriceObservation(0, 0, 1000)
+    token_price, eth_price = twap(start, accumulate(start, periods))
+    assert from_uq112x112(token_price) == pytest.approx((2 * 10 + 8 * 30) / 40)
+    assert from_uq112x112(eth_price) == pytest.approx((0.5 * 10 + 0.125 * 30) / 40)
+
+    # Accumulator and timestamp wrap-around
+    start = PriceObservation(2**256 - Q112, 2**256 - 1, 2**32 - 5)
+    assert twap(start, accumulate(start, periods)) == (int(6.5 * Q112), int(0.21875 * Q112))
+
+    with pytest.raises(ValueError):
+        twap(start, start)
+
+
+def test_batch_single_orders_match_swaps():
+    for token_reserve, eth_reserve, fee in [(100, 200, 5), (1000, 37, 0), (55, 5000, 30)]:
+        for amount in range(0, token_reserve, 7):
+            assert quote_batch(token_reserve, eth_reserve, fee, [amount], [])[0] == [quote_buy(token_reserve, eth_reserve, fee, amount)]
+            assert quote_batch(token_reserve, eth_reserve, fee, [], [amount])[1] == [quote_sell(token_reserve, eth_reserve, fee, amount)]
+
+
+def test_batch_netting():
+    pool = ConstantProductPool(1000, 1000, 5, 1000)
+    buy_quotes, sell_quotes = pool.settle_batch([100, 50], [150])
+
+    # Buys of 150 and sells of 150 - 8 (token fee) leave a net buy of 8 tokens from the curve
+    net_eth_in = quote_buy(1000, 1000, 0, 8)[0]
+    assert sum(price - eth_fee for price, eth_fee, _ in buy_quotes) >= net_eth_in + sum(value + eth_fee for value, eth_fee, _ in sell_quotes)
+    assert pool.token_reserve * pool.eth_reserve >= 1000 * 1000
+    # Far cheaper than crossing the curve with the two buys separately
+    assert sum(price for price, _, _ in buy_quotes) < ConstantProductPool(1000, 1000, 5, 1000).buy(150)[0]
+
+
+def test_build_batch_rejects_unmet_limits():
+    pool = ConstantProductPool(1000, 1000, 5, 1000)
+    buys = [Order('0x' + '11' * 20, 100, 200), Order('0x' + '22' * 20, 100, 100)] # The second limit is too low
+    sells = [Order('0x' + '33' * 20, 50, 0), Order('0x' + '44' * 20, 50, 10**6)] # The second limit is too high
+    batch = build_batch(pool, buys, sells)
+    assert batch.buys == buys[:1] and batch.sells == sells[:1]
+    assert batch.rejected == [buys[1], sells[1]]
+    assert all(price <= order.limit for order, (price, _, _) in zip(batch.buys, batch.buy_quotes))
+    assert batch.eth_value() == sum(price for price, _, _ in batch.buy_quotes)
+    assert batch.token_amount() == 50
+
+    # A net buy larger than the pool drops the largest buys
+    batch = build_batch(pool, [Order('0x' + '11' * 20, 2000, 10**9), Order('0x' + '22' * 20, 10, 10**9)], [])
+    assert [order.amount for order in batch.buys] == [10]
+
@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+
+from brownie import accounts
+
+from tests.test_tokens import msg, deploy_ru_token, mint_ru_tokens
+from scripts.async_token import AsyncRUToken
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def test_async_views_match_contract():
+    a1, a2, a3 = accounts[1:4]
+    tok = deploy_ru_token(100, 1000, accounts[0])
+    mint_ru_tokens(tok, a1, 300)
+    mint_ru_tokens(tok, a2, 20)
+    tok.approve(a2, 50, msg(a1))
+    tx = tok.registerMultisigAddress(a1, a2, a3)
+    multisig = tx.return_value
+
+    async def query():
+        async with AsyncRUToken.from_contract(tok) as client:
+            results = await asyncio.gather(
+                client.balanceOf(a1), client.balanceOf(a2), client.balanceOf(a1),
+                client.allowance(a1, a2), client.nonce(multisig),
+                client.getMultisigAddress(a1, a2, a3),
+            )
+            return results, client.requests_sent, client.calls_sent
+
+    results, requests_sent, calls_sent = asyncio.run(query())
+
+    assert results == [300, 20, 300, 50, 1, multisig]
+    assert requests_sent == 1 # All calls went out in one JSON-RPC batch
+    assert calls_sent == 5 # The repeated balanceOf(a1) call was merged
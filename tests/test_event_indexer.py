@@ -0,0 +1,68 @@
+import pytest
+from brownie import accounts, chain
+
+from tests.test_tokens import msg, deploy_ru_token, mint_ru_tokens
+from scripts.event_indexer import TokenEventIndex
+from scripts.exchange import grade_exchange
+from scripts.exchange_indexer import BUY, SELL, MINT, BURN, BATCH, ReserveHistory
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def test_index_balances_and_transfers(tmp_path):
+    a1, a2, a3 = accounts[1:4]
+    tok = deploy_ru_token(100, 1000, accounts[0])
+    start_block = chain.height
+
+    mint_ru_tokens(tok, a1, 300)
+    tok.transfer(a2, 100, msg(a1))
+    checkpoint_block = chain.height
+    tok.approve(a3, 50, msg(a2))
+    tok.transferFrom(a2, a3, 40, msg(a3))
+    tok.burn(10, msg(a3))
+
+    index = TokenEventIndex(str(tmp_path), tok.address, start_block)
+    assert index.sync(to_block=checkpoint_block) == 2 # The mint and the first transfer
+
+    # Reopening continues from the checkpoint
+    index = TokenEventIndex(str(tmp_path), tok.address, start_block)
+    assert index.sync() == 3
+    assert index.sync() == 0
+
+    for account in (a1, a2, a3):
+        assert index.balance_of(account) == tok.balanceOf(account)
+    assert index.balance_of(a2, checkpoint_block) == 100
+    assert index.balance_of(a3, checkpoint_block) == 0
+
+    assert [(t['from'], t['to'], t['value']) for t in index.transfers_of(a3)] == [(a2.address, a3.address, 40), (a3.address, '0x' + '00' * 20, 10)]
+    assert [(t['spender'], t['value']) for t in index.approvals_of(a2)] == [(a3.address, 50)]
+
+
+# ReserveHistory against the logs of a deployed exchange (the `exchange_world` of tests/conftest.py)
+@pytest.mark.skipif(not grade_exchange, reason="Exchange not implemented!")
+def test_reserve_history(exchange_world, tmp_path):
+    tok, exch = exchange_world
+    history = ReserveHistory(str(tmp_path), exch.address) # From block 0, so it sees the world's initialization
+
+    def pool_state():
+        return (exch.tokenBalance(), exch.balance(), exch.totalSupply())
+
+    history.poll()
+    assert history.reserves_at() == pool_state()
+    initial_block, initial_state = chain.height, pool_state()
+
+    exch.buyTokens(10, 1e7, msg(accounts[1], 1e7))
+    tok.approve(exch, 1e6, msg(accounts[1]))
+    exch.sellTokens(5, 0, msg(accounts[1]))
+    tok.mint(msg(accounts[1], 1e6))
+    exch.mintLiquidityTokens(10, 1e6, 1e6, msg(accounts[1], 1e6))
+    exch.settleBatch([(accounts[2], 5, 1e7)], [(accounts[1], 5, 0)], msg(accounts[1], 1e7))
+    exch.burnLiquidityTokens(5, 0, 0, msg(accounts[1]))
+
+    assert history.poll() == 5
+    assert history.reserves_at() == pool_state()
+    assert history.reserves_at(initial_block) == initial_state
+    assert list(history.series()['kind']) == [MINT, BUY, SELL, MINT, BATCH, BURN]
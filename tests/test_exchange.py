@@ -8,6 +8,10 @@ from hypothesis import settings
 from hypothesis.strategies import tuples
 from tests.test_tokens import msg, deploy_ru_token, mint_ru_tokens, checkFailedTransfer, checkSuccessfulTransfer, GenericTokenTest
 from scripts.exchange import grade_exchange
+from scripts.amm import ConstantProductPool, PriceObservation, Q112, cumulative_price_increments, observe, twap
+from scripts.batch_orders import Order, OrderCollector
+from scripts.permit import permit_args, sign_permit
+from brownie import chain
 
 pytestmark = pytest.mark.skipif(not grade_exchange, reason="Exchange not implemented! (Set bonus_multisig_token.grade_bonus = True to allow grading)")
 
@@ -39,18 +43,22 @@ def initialize_ru_exchange(exch: RUExchange, tok: RUToken, account, fee: int, in
 
 
 @pytest.fixture(autouse=True, scope='class')
-def default_setup(request):
+def default_setup(request, exchange_token, fresh_exchanges):
     request.cls.price = default_price
     request.cls.maxtok = default_maxtok
-    request.cls.rutoken = deploy_ru_token(default_price, default_maxtok, accounts[0])
+    request.cls.rutoken = exchange_token # deploy_ru_token(default_price, default_maxtok, accounts[0]), once per session
     request.cls.feePercent = default_feepercent
     request.cls.initial_tokens = default_initial_tokens
     request.cls.initial_eth = default_initial_eth
+    request.cls.fresh_exchanges = fresh_exchanges # Uninitialized, by deployer; deployed once per session
 
 
+# The tests with the default parameters start from the `exchange_world` snapshot (see tests/conftest.py) instead of
+# deploying and initializing an exchange. The other tests, and every hypothesis example, initialize one of the
+# `fresh_exchanges` with their own fee and initial liquidity; reverting to the worlds makes it uninitialized again.
 class TestExchangeSpecifics:
     def deploy_and_init_exchange(self, owner_account) -> RUExchange:
-        exch = deploy_ru_exchange(owner_account)
+        exch = self.fresh_exchanges[owner_account.address]
         initialize_ru_exchange(exch, self.rutoken, owner_account, self.feePercent, self.initial_tokens, self.initial_eth)
         return exch
 
@@ -273,6 +281,198 @@ class TestExchangeSpecifics:
         self.burnliquidity_testbody(feepercent, initial_eth, tokdata)
 
 
+    # Differential test: the off-chain simulator must quote exactly what the exchange charges
+    @given(
+        feepercent=strategy('uint', min_value=0, max_value=95),
+        initial_eth=strategy('uint', min_value=10, max_value=300),
+        # tokens_to_buy, initialsupply
+        tokdata=tuples(strategy('uint', min_value=1, max_value=100),strategy('uint', min_value=2, max_value=100)).map(sorted).filter(lambda x: x[0] < x[1]),
+        liquidity=strategy('uint', min_value=1, max_value=100),
+    )
+    @settings(max_examples=20)
+    def test_simulator_matches_exchange(self, feepercent, initial_eth, tokdata, liquidity):
+        self.feePercent = feepercent
+        self.initial_eth = initial_eth
+        buytokens, self.initial_tokens = tokdata
+        exch = self.deploy_and_init_exchange(accounts[0])
+        pool = ConstantProductPool.from_exchange(exch, feepercent)
+
+        expected = pool.buy(buytokens)
+        tx = exch.buyTokens(buytokens, 1e7, msg(accounts[1], 1e7))
+        assert tx.return_value == expected
+
+        selltokens = buytokens - expected[2]
+        if selltokens > 0:
+            self.rutoken.approve(exch, selltokens, msg(accounts[1]))
+            expected = pool.sell(selltokens)
+            tx = exch.sellTokens(selltokens, 0, msg(accounts[1]))
+            assert tx.return_value == expected
+
+        self.rutoken.mint(msg(accounts[1], 1e6))
+        self.rutoken.approve(exch, 1e6, msg(accounts[1]))
+        expected = pool.mint_liquidity(liquidity)
+        tx = exch.mintLiquidityTokens(liquidity, 1e6, 1e6, msg(accounts[1], 1e6))
+        assert tx.return_value == expected
+
+        expected = pool.burn_liquidity(liquidity)
+        tx = exch.burnLiquidityTokens(liquidity, 0, 0, msg(accounts[1]))
+        assert tx.return_value == expected
+
+        assert (exch.tokenBalance(), exch.balance(), exch.totalSupply()) == (pool.token_reserve, pool.eth_reserve, pool.total_liquidity)
+
+    @given(
+        feepercent=strategy('uint', min_value=0, max_value=20),
+        initial_eth=strategy('uint', min_value=1, max_value=100),
+        # tokens_to_buy, initialsupply
+        tokdata=tuples(strategy('uint', min_value=1, max_value=100),strategy('uint', min_value=2, max_value=100)).map(sorted).filter(lambda x: x[0] < x[1]),
+        liquidity=strategy('uint', min_value=1, max_value=100),
+    )
+    @settings(max_examples=20)
+    def test_quote_views(self, feepercent, initial_eth, tokdata, liquidity):
+        self.feePercent = feepercent
+        self.initial_eth = initial_eth
+        buytokens, self.initial_tokens = tokdata
+        exch = self.deploy_and_init_exchange(accounts[0])
+        pool = ConstantProductPool.from_exchange(exch, feepercent)
+
+        # The views match the simulator and the transactions, and change no state
+        quote = exch.quoteBuyTokens(buytokens)
+        assert quote == pool.quote_buy(buytokens)
+        assert exch.quoteBuyTokens(buytokens) == quote
+        assert exch.buyTokens(buytokens, 1e7, msg(accounts[1], 1e7)).return_value == quote
+        pool.buy(buytokens)
+
+        selltokens = buytokens - quote[2]
+        if selltokens > 0:
+            quote = exch.quoteSellTokens(selltokens)
+            assert quote == pool.quote_sell(selltokens)
+            self.rutoken.approve(exch, selltokens, msg(accounts[1]))
+            assert exch.sellTokens(selltokens, 0, msg(accounts[1])).return_value == quote
+            pool.sell(selltokens)
+
+        quote = exch.quoteMintLiquidityTokens(liquidity)
+        assert quote == pool.quote_mint_liquidity(liquidity)
+        self.rutoken.mint(msg(accounts[1], 1e6))
+        self.rutoken.approve(exch, 1e6, msg(accounts[1]))
+        assert exch.mintLiquidityTokens(liquidity, 1e6, 1e6, msg(accounts[1], 1e6)).return_value == quote
+        pool.mint_liquidity(liquidity)
+
+        quote = exch.quoteBurnLiquidityTokens(liquidity)
+        assert quote == pool.quote_burn_liquidity(liquidity)
+        assert exch.burnLiquidityTokens(liquidity, 0, 0, msg(accounts[1])).return_value == quote
+
+        with brownie.reverts():
+            exch.quoteBuyTokens(exch.tokenBalance())
+        with brownie.reverts():
+            exch.quoteBurnLiquidityTokens(exch.totalSupply() + 1)
+
+    def test_quote_views_uninitialized(self):
+        exch = deploy_ru_exchange(accounts[0])
+        for amount in (0, 1):
+            with brownie.reverts("can't buy more tokens than the pool holds"):
+                exch.quoteBuyTokens(amount)
+            for quote in (exch.quoteSellTokens, exch.quoteMintLiquidityTokens, exch.quoteBurnLiquidityTokens):
+                with brownie.reverts("exchange is not initialized"):
+                    quote(amount)
+
+    def test_initialize_deployer_only(self):
+        exch = deploy_ru_exchange(accounts[0])
+        mint_ru_tokens(self.rutoken, accounts[1], self.initial_tokens)
+        self.rutoken.approve(exch, self.initial_tokens, msg(accounts[1]))
+        with brownie.reverts("only the deployer can initialize the exchange"):
+            exch.initialize(self.rutoken, self.feePercent, self.initial_tokens, self.initial_eth, msg(accounts[1], self.initial_eth))
+
+        initialize_ru_exchange(exch, self.rutoken, accounts[0], self.feePercent, self.initial_tokens, self.initial_eth)
+        assert exch.balanceOf(accounts[0]) == self.initial_tokens
+
+    def test_permit_deposits(self, localaccounts):
+        owner = localaccounts[2]
+        accounts[0].transfer(owner, 1e18)
+        mint_ru_tokens(self.rutoken, owner, 1000)
+        deadline = chain.time() + 3600
+
+        exch = deploy_ru_exchange(owner) # Only the deployer may initialize it
+        # Before initialization the permit is skipped, and the deposit itself is rejected
+        sig = sign_permit(self.rutoken, owner.private_key, exch, 10, deadline)
+        with brownie.reverts("exchange is not initialized"):
+            exch.sellTokensWithPermit(10, 0, deadline, sig.encoded(), msg(owner))
+
+        sig = sign_permit(self.rutoken, owner.private_key, exch, self.initial_tokens, deadline)
+        exch.initializeWithPermit(self.rutoken, self.feePercent, self.initial_tokens, self.initial_eth, deadline, sig.encoded(),
+                                  msg(owner, self.initial_eth))
+        assert exch.tokenBalance() == self.initial_tokens
+        assert self.rutoken.allowance(owner, exch) == 0
+
+        sig = sign_permit(self.rutoken, owner.private_key, exch, 10, deadline)
+        exch.sellTokensWithPermit(10, 0, deadline, sig.encoded(), msg(owner))
+        assert exch.tokenBalance() == self.initial_tokens + 10
+
+        # A permit that was already submitted (e.g. front-run by someone else) doesn't block the call
+        sig = sign_permit(self.rutoken, owner.private_key, exch, 1000, deadline)
+        self.rutoken.permit(owner, exch, 1000, deadline, *permit_args(sig), msg(accounts[1]))
+        exch.mintLiquidityTokensWithPermit(10, 1000, 1e6, deadline, sig.encoded(), msg(owner, 1e6))
+        assert exch.balanceOf(owner) == self.initial_tokens + 10
+        assert exch.balance() == exch.getReserves()[1] # The unused ETH was returned
+
+        # Without a valid permit or allowance the deposit fails
+        self.rutoken.approve(exch, 0, msg(owner))
+        with brownie.reverts():
+            exch.sellTokensWithPermit(10, 0, deadline, sig.encoded(), msg(owner))
+
+    def test_settle_batch(self, exchange_world):
+        a0, a1, a2, a3 = accounts[0:4]
+        tok, exch = exchange_world
+        collector = OrderCollector(exch, tok, self.feePercent)
+        tok.mint(msg(a0, 1e6))
+
+        collector.add_buy(a1, 10, 1e7)
+        collector.add_buy(a2, 5, 1e7)
+        collector.add_buy(a2, 5, 0) # Limit can't be met
+        collector.add_sell(a3, 12, 0)
+        pool = ConstantProductPool.from_exchange(exch, self.feePercent)
+        balances = (tok.balanceOf(a1), tok.balanceOf(a2), a3.balance())
+
+        batch, tx = collector.settle(a0)
+        assert len(collector) == 0
+        assert batch.rejected == [Order(a2, 5, 0)]
+        assert tx.return_value == (batch.eth_value(), sum(value for value, _, _ in batch.sell_quotes))
+        assert (batch.buy_quotes, batch.sell_quotes) == pool.settle_batch([10, 5], [12])
+        assert tok.balanceOf(a1) == balances[0] + 10 - batch.buy_quotes[0][2]
+        assert tok.balanceOf(a2) == balances[1] + 5 - batch.buy_quotes[1][2]
+        assert a3.balance() == balances[2] + batch.sell_quotes[0][0]
+        assert exch.getReserves()[:2] == (pool.token_reserve, pool.eth_reserve)
+        assert 'BatchSettled' in tx.events
+
+        # The whole batch reverts if a limit is not met
+        with brownie.reverts():
+            exch.settleBatch([(a1, 10, 0)], [], msg(a0, 1e7))
+
+    def test_price_oracle(self, exchange_world):
+        _, exch = exchange_world
+        initial = exch.getReserves()
+        assert initial[:2] == (exch.tokenBalance(), exch.balance())
+        start = observe(exch)
+
+        chain.sleep(100)
+        tx = exch.buyTokens(10, 1e7, msg(accounts[1], 1e7))
+        after = exch.getReserves()
+        assert after[:2] == (exch.tokenBalance(), exch.balance())
+        at_buy = PriceObservation(*exch.observe(block_identifier=tx.block_number))
+        assert at_buy.timestamp == after[2]
+        # The prices before the buy were accumulated up to its block
+        assert (at_buy.token_price_cumulative - start.token_price_cumulative, at_buy.eth_price_cumulative - start.eth_price_cumulative) == \
+            cumulative_price_increments(initial[0], initial[1], at_buy.timestamp - start.timestamp)
+
+        chain.sleep(100)
+        chain.mine()
+        end = observe(exch)
+        assert (end.token_price_cumulative - at_buy.token_price_cumulative, end.eth_price_cumulative - at_buy.eth_price_cumulative) == \
+            cumulative_price_increments(after[0], after[1], end.timestamp - at_buy.timestamp)
+
+        # Buying raised the ETH-per-token price; the average lies between the prices before and after
+        token_price, _ = twap(start, end)
+        assert initial[1] * Q112 // initial[0] <= token_price <= after[1] * Q112 // after[0]
+
 
 class TestExchangeAsToken(GenericTokenTest):
     # Must override this function!
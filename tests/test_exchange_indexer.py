@@ -0,0 +1,62 @@
+import pytest
+from hexbytes import HexBytes
+
+from scripts import exchange_indexer
+from scripts.exchange_indexer import BUY, SELL, MINT, BURN, BATCH, EVENT_TOPICS, ReserveHistory
+
+
+# A log of an RUExchange event of `kind` with the given uint256 fields as its data (the indexed address is not read)
+def exchange_log(kind, block, log_index, *fields):
+    topic = next(topic for topic, topic_kind in EVENT_TOPICS.items() if topic_kind == kind)
+    return {
+        'topics': [topic, HexBytes(bytes(32))],
+        'data': HexBytes(b''.join(field.to_bytes(32, 'big') for field in fields)),
+        'blockNumber': block,
+        'logIndex': log_index,
+    }
+
+
+# ReserveHistory against synthetic logs, without a chain, so it is tested whether or not the exchange is graded
+def test_reserve_history_from_logs(tmp_path, monkeypatch):
+    logs = [
+        # amount, tokens, eth, tokenReserve, ethReserve, totalLiquidity
+        exchange_log(MINT, 10, 0, 100, 100, 200, 100, 200, 100),
+        # amount, price, ethFee, tokenFee, tokenReserve, ethReserve
+        exchange_log(BUY, 12, 2, 10, 24, 2, 1, 91, 224),
+        exchange_log(SELL, 12, 5, 5, 11, 1, 1, 96, 213),
+        # tokensBought, tokensSold, ethPaid, ethReceived, tokenReserve, ethReserve
+        exchange_log(BATCH, 15, 0, 20, 4, 40, 8, 81, 245),
+        # amount, tokens, eth, tokenReserve, ethReserve, totalLiquidity
+        exchange_log(BURN, 17, 1, 10, 8, 24, 73, 221, 90),
+    ]
+
+    def fetch_logs(address, topics, from_block, to_block):
+        assert set(topics) == set(EVENT_TOPICS)
+        return [log for log in logs if from_block <= log['blockNumber'] <= to_block]
+
+    monkeypatch.setattr(exchange_indexer, 'fetch_logs', fetch_logs)
+    address = '0x' + '11' * 20
+
+    history = ReserveHistory(str(tmp_path), address, start_block=10)
+    with pytest.raises(LookupError):
+        history.reserves_at()
+    assert history.poll(to_block=12, batch_blocks=2) == 3
+    assert history.reserves_at() == (96, 213, 100)
+
+    # Reopening continues from the checkpoint, including the liquidity supply carried forward to swaps
+    history = ReserveHistory(str(tmp_path), address, start_block=10)
+    assert history.poll(to_block=20) == 2
+    assert history.poll(to_block=20) == 0
+
+    assert history.reserves_at() == (73, 221, 90)
+    assert history.reserves_at(11) == (100, 200, 100)
+    assert history.reserves_at(12) == (96, 213, 100)
+    assert history.reserves_at(16) == (81, 245, 100)
+    with pytest.raises(LookupError):
+        history.reserves_at(9)
+
+    series = history.series()
+    assert list(series['kind']) == [MINT, BUY, SELL, BATCH, BURN]
+    assert list(series['block']) == [10, 12, 12, 15, 17]
+    assert list(series['total_liquidity']) == [100, 100, 100, 100, 90]
+    assert series['price'][0] == 2.0
@@ -0,0 +1,168 @@
+import fcntl
+import json
+import os
+import pytest
+
+from brownie import accounts, web3
+from eth_utils import keccak
+
+from tests.test_tokens import msg, mint_ru_tokens
+from tests.test_exchange import deploy_ru_exchange
+from tests.test_multisig import transfer_bysig
+from scripts.exchange import grade_exchange
+from scripts.multisig_token import UnorderedNonceAllocator, generate_nonce_and_second_signature_transfer2of3_batch, generate_unordered_nonce_and_second_signature_transfer2of3
+
+# Gas used per benchmarked call is compared against tests/gas_baseline.json, which must be recorded and committed.
+# A call missing from the baseline (or a missing file) fails its test, so the regression check can't be skipped silently.
+# Set UPDATE_GAS_BASELINE=1 to record every measured call into the baseline instead of checking it (e.g. after an intended
+# gas change, or to create the file); the session then ends with a before/after table of the changed entries.
+GAS_BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'gas_baseline.json')
+GAS_REGRESSION_THRESHOLD = 0.05 # Fail if a call uses more than 5% more gas than its baseline
+
+
+def load_gas_baseline() -> dict:
+    if not os.path.exists(GAS_BASELINE_FILE):
+        return {}
+    with open(GAS_BASELINE_FILE) as f:
+        return json.load(f)
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+@pytest.fixture(scope='session')
+def gas_baseline(request):
+    baseline = load_gas_baseline()
+    update = bool(os.environ.get('UPDATE_GAS_BASELINE'))
+    measured = {}
+
+    def check(name, tx):
+        measured[name] = tx.gas_used
+        if update:
+            return tx
+        if name not in baseline:
+            pytest.fail(f"no gas baseline for {name} ({tx.gas_used} gas); record it with UPDATE_GAS_BASELINE=1")
+        limit = baseline[name] * (1 + GAS_REGRESSION_THRESHOLD)
+        assert tx.gas_used <= limit, f"{name} used {tx.gas_used} gas (baseline {baseline[name]})"
+        return tx
+
+    yield check
+
+    if not update or not measured:
+        return
+    # With `brownie test -n N` every worker process measures its own share of the calls, so the file is re-read and
+    # merged under a lock instead of being overwritten with this process's view of it.
+    with open(GAS_BASELINE_FILE + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        previous = load_gas_baseline()
+        with open(GAS_BASELINE_FILE, 'w') as f:
+            json.dump(dict(sorted({**previous, **measured}.items())), f, indent=2)
+            f.write('\n')
+
+    reporter = request.config.pluginmanager.get_plugin('terminalreporter')
+    if reporter is not None:
+        reporter.write_sep('-', 'gas baseline changes')
+        for name, gas in sorted(measured.items()):
+            if name not in previous:
+                reporter.write_line(f"{name:<32}{'new':>10} -> {gas:>8}")
+            elif previous[name] != gas:
+                reporter.write_line(f"{name:<32}{previous[name]:>10} -> {gas:>8} ({(gas - previous[name]) / previous[name]:+.1%})")
+
+
+# Globals
+price = 100
+multisig_mapping_slot = 5 # RUToken.multiAdd, after maxTokens, tokenPrice, totalAmount, balances and allowances
+
+
+# RUToken with 1000 tokens minted to accounts[1]; deployed once per session (see tests/conftest.py).
+@pytest.fixture
+def tok(ru_token_world):
+    return ru_token_world
+
+
+def test_gas_transfer(tok, gas_baseline):
+    a1, a2 = accounts[1:3]
+    gas_baseline('transfer_cold', tok.transfer(a2, 10, msg(a1))) # Recipient had no balance
+    gas_baseline('transfer_warm', tok.transfer(a2, 10, msg(a1))) # Recipient already has a balance
+
+
+def test_gas_approve_transferFrom(tok, gas_baseline):
+    a1, a2, a3 = accounts[1:4]
+    gas_baseline('approve', tok.approve(a2, 100, msg(a1)))
+    gas_baseline('transferFrom', tok.transferFrom(a1, a3, 10, msg(a2)))
+    gas_baseline('approve_infinite', tok.approve(a2, 2**256 - 1, msg(a1)))
+    gas_baseline('transferFrom_infinite', tok.transferFrom(a1, a3, 10, msg(a2))) # Allowance is not written
+
+
+def test_gas_mint_burn(tok, gas_baseline):
+    a2 = accounts[2]
+    gas_baseline('mint', tok.mint(msg(a2, 10 * price)))
+    gas_baseline('burn', tok.burn(5, msg(a2)))
+
+
+def test_gas_batch_transfer(tok, gas_baseline):
+    a1 = accounts[1]
+    recipients = accounts[2:10]
+    gas_baseline('batchTransfer_8', tok.batchTransfer(recipients, [5] * len(recipients), msg(a1)))
+
+
+def test_gas_multisig(tok, gas_baseline, localaccounts):
+    a1, a2 = accounts[1:3]
+    l1, l2, l3 = localaccounts[0:3]
+
+    tx = gas_baseline('registerMultisigAddress', tok.registerMultisigAddress(l1, l2, l3, msg(a1)))
+    multisig = accounts.at(tx.return_value, force=True)
+    tok.transfer(multisig, 100, msg(a1))
+    gas_baseline('transfer2of3', transfer_bysig(tok, multisig, a2, l1, l2.private_key, 10))
+    nonce, sig = generate_unordered_nonce_and_second_signature_transfer2of3(UnorderedNonceAllocator(tok), l2.private_key, multisig, a2, 10)
+    gas_baseline('transfer2of3Unordered', tok.transfer2of3Unordered(multisig, a2, 10, nonce, sig.encoded(), msg(l1)))
+    legs = [(account, 5) for account in accounts[2:6]]
+    nonce, sig = generate_nonce_and_second_signature_transfer2of3_batch(tok, l2.private_key, multisig, legs)
+    gas_baseline('transfer2of3Batch_4', tok.transfer2of3Batch(multisig, [leg[0] for leg in legs], [leg[1] for leg in legs], nonce, sig.encoded(), msg(l1)))
+
+
+# Returns the first `count` storage words of the multiAdd entry of `multisig`.
+def multisig_storage(tok, multisig, count):
+    key = bytes(12) + bytes.fromhex(multisig.address[2:]) + multisig_mapping_slot.to_bytes(32, 'big')
+    base = int.from_bytes(keccak(key), 'big')
+    return [int.from_bytes(web3.eth.get_storage_at(tok.address, base + i), 'big') for i in range(count)]
+
+
+# The registerMultisigAddress and transfer2of3 benchmarks above rely on the packed multisig layout: three slots, with
+# the nonce next to pk1, so transfer2of3 reads the nonce along with the first key and writes it back to a warm slot.
+def test_multisig_packed_layout(tok, localaccounts):
+    a1, a2 = accounts[1:3]
+    l1, l2, l3 = localaccounts[0:3]
+
+    multisig = accounts.at(tok.registerMultisigAddress(l1, l2, l3, msg(a1)).return_value, force=True)
+    tok.transfer(multisig, 100, msg(a1))
+    transfer_bysig(tok, multisig, a2, l1, l2.private_key, 10)
+
+    pk1, pk2, pk3 = (int(account.address, 16) for account in (l1, l2, l3))
+    assert multisig_storage(tok, multisig, 4) == [(2 << 160) | pk1, pk2, pk3, 0]
+
+
+@pytest.mark.skipif(not grade_exchange, reason="Exchange not implemented!")
+def test_gas_exchange_initialize(tok, gas_baseline):
+    a0 = accounts[0]
+    exch = deploy_ru_exchange(a0)
+
+    mint_ru_tokens(tok, a0, 100)
+    tok.approve(exch, 100, msg(a0))
+    gas_baseline('exchange_initialize', exch.initialize(tok, 5, 100, 200, msg(a0, 200)))
+
+
+@pytest.mark.skipif(not grade_exchange, reason="Exchange not implemented!")
+def test_gas_exchange(exchange_world, gas_baseline):
+    a1, a2 = accounts[1:3]
+    tok, exch = exchange_world
+
+    gas_baseline('exchange_buyTokens', exch.buyTokens(10, 1e7, msg(a1, 1e7)))
+    tok.approve(exch, 1e6, msg(a1))
+    gas_baseline('exchange_sellTokens', exch.sellTokens(5, 0, msg(a1)))
+    mint_ru_tokens(tok, a1, 1000) # The bought tokens don't cover the liquidity deposit
+    gas_baseline('exchange_mintLiquidityTokens', exch.mintLiquidityTokens(10, 1e6, 1e6, msg(a1, 1e6)))
+    gas_baseline('exchange_burnLiquidityTokens', exch.burnLiquidityTokens(10, 0, 0, msg(a1)))
+    gas_baseline('exchange_settleBatch', exch.settleBatch([(a1, 10, 1e7), (a2, 10, 1e7)], [(a1, 5, 0)], msg(a1, 1e7)))
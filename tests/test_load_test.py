@@ -0,0 +1,41 @@
+import pytest
+
+from brownie import accounts
+
+from tests.test_tokens import deploy_ru_token
+from scripts.load_test import LoadTest, load_accounts
+from scripts.token_views import balances_of
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def test_load_test_mix():
+    tok = deploy_ru_token(100, 10**9, accounts[0])
+    test = LoadTest(tok, load_accounts(6), threads=2, seed=1)
+    test.setup(accounts[0], tokens_each=100, eth_each=10**17)
+    report = test.run(40)
+
+    ops = report['operations']
+    assert report['failed'] == 0
+    assert sum(stats['count'] for name, stats in ops.items() if name != 'approve') == 40
+    assert ops.get('approve', {}).get('count', 0) == ops.get('transferFrom', {}).get('count', 0)
+    for stats in ops.values():
+        assert stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms']
+        assert stats['mean_gas'] > 0
+
+    # Every transfer2of3 used the next nonce of its thread's multisig address
+    assert sum(tok.nonce(multisig) - 1 for multisig in test.multisigs) == ops.get('transfer2of3', {}).get('count', 0)
+    # Tokens only moved between the load accounts, apart from the mints and burns
+    minted, burned = ops.get('mint', {}).get('count', 0), ops.get('burn', {}).get('count', 0)
+    assert sum(balances_of(tok, test.accounts + test.multisigs)) == 100 * 8 + minted - burned
+
+
+def test_load_test_rejects_bad_config():
+    tok = deploy_ru_token(100, 10**9, accounts[0])
+    with pytest.raises(ValueError):
+        LoadTest(tok, load_accounts(6), mix={'swap': 1}, threads=2)
+    with pytest.raises(ValueError):
+        LoadTest(tok, load_accounts(5), threads=2)
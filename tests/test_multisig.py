@@ -5,7 +5,8 @@ from brownie import RUToken, accounts
 
 from tests.test_tokens import msg, checkFailedTransfer, checkSuccessfulTransfer, deploy_ru_token, mint_ru_tokens, transfer_direct
 
-from scripts.multisig_token import grade_multisig, generate_nonce_and_second_signature_transfer2of3
+from scripts.multisig_token import grade_multisig, generate_nonce_and_second_signature_transfer2of3, generate_nonces_and_second_signatures_transfer2of3, ParallelSigner, keys, NonceManager, generate_managed_nonce_and_second_signature_transfer2of3, Transfer2of3Digest, generate_nonce_and_second_signature_transfer2of3_batch, Transfer2of3Validator, multisig_address, multisig_addresses_of, MultisigDirectory, UnorderedNonceAllocator, generate_unordered_nonce_and_second_signature_transfer2of3
+from web3 import Web3
 
 pytestmark = pytest.mark.skipif(not grade_multisig, reason="Multisig Token not implemented! (Set multisig_token.grade_multisig = True to allow grading)")
 
@@ -19,11 +20,6 @@ def transfer_bysig(tok: RUToken, src, dst, sender, sk, amount):
 def isolation(fn_isolation):
     pass
 
-@pytest.fixture(scope='module')
-def localaccounts():
-    return [accounts.add(private_key=bytes([i+1] * 32))  for i in range(10)]
-
-
 # Globals
 price = 100
 xfernum = 200 
@@ -44,12 +40,10 @@ def register_multisigs(tok, localaccounts):
     return multisigs
 
 
+# Token with the multisigs of `localaccounts` registered; deployed once per session (see tests/conftest.py).
 @pytest.fixture(scope='module')
-def deploy_multisigs(localaccounts): 
-    l1, l2, l3 = localaccounts[0:3]
-    tok = deploy_and_mint(price, maxtok, totalmint, accounts[1])
-    multisigs = register_multisigs(tok, localaccounts)
-    return tok, multisigs
+def deploy_multisigs(multisig_world):
+    return multisig_world
 
 
 def test_simple_transfer2of3(localaccounts, deploy_multisigs):
@@ -220,3 +214,257 @@ def test_multicontract_replay_transfer2of3(localaccounts, deploy_multisigs):
     with brownie.reverts():
         tx = tok2.transfer2of3(multisigs[0], a2, xfernum, nonce, sig.encoded(), msg(l1))
 
+
+def test_batch_signed_transfer2of3(localaccounts, deploy_multisigs):
+    a1, a2, a3 = accounts[1:4]
+    l1, l2, l3, l4, l5 = localaccounts[0:5]
+
+    tok, multisigs = deploy_multisigs
+
+    checkSuccessfulTransfer(tok, a1, multisigs[0], a1, xfernum, transfer_direct) # Transfer *to* multisig address (l1,l2,l3)
+    checkSuccessfulTransfer(tok, a1, multisigs[1], a1, xfernum, transfer_direct) # Transfer *to* multisig address (l2,l3,l4)
+
+    jobs = [(multisigs[0], a2, 10), (multisigs[1], a3, 20), (multisigs[0], a3, 30), (multisigs[0], a2, 40)]
+    signed = generate_nonces_and_second_signatures_transfer2of3(tok, l3.private_key, jobs)
+
+    assert [nonce for nonce, sig in signed] == [2, 2, 3, 4]
+
+    for (src, dst, amount), (nonce, sig) in zip(jobs, signed):
+        sender = l1 if src == multisigs[0] else l2
+        tx = tok.transfer2of3(src, dst, amount, nonce, sig.encoded(), msg(sender))
+        assert tx.events['Transfer']['value'] == amount
+
+    assert tok.balanceOf(multisigs[0]) == xfernum - 80
+    assert tok.balanceOf(multisigs[1]) == xfernum - 20
+
+
+def test_parallel_signer(localaccounts):
+    l2 = localaccounts[1]
+    key = keys.PrivateKey(bytes.fromhex(l2.private_key[2:]))
+    message_hashes = [Web3.solidityKeccak(['uint256'], [i]) for i in range(20)]
+
+    with ParallelSigner(l2.private_key, processes=2, chunksize=4) as signer:
+        signatures = signer.sign(message_hashes)
+        assert signer.signatures_per_second() > 0
+
+        # A stream is read one window at a time
+        stream = iter(message_hashes)
+        signer.window = 8
+        streamed = signer.sign_stream(stream)
+        assert next(streamed).r == signatures[0].r
+        assert len(list(stream)) == len(message_hashes) - 8
+
+    for message_hash, sig in zip(message_hashes, signatures):
+        expected = keys.ecdsa_sign(message_hash, key)
+        assert (sig.r, sig.s, sig.v) == (expected.r, expected.s, expected.v)
+
+
+def test_nonce_manager_transfer2of3(localaccounts, deploy_multisigs):
+    a1, a2, a3 = accounts[1:4]
+    l1, l2, l3 = localaccounts[0:3]
+
+    tok, multisigs = deploy_multisigs
+    nonces = NonceManager(tok)
+
+    checkSuccessfulTransfer(tok, a1, multisigs[0], a1, xfernum, transfer_direct) # Transfer *to* multisig address (l1,l2,l3)
+
+    # A nonce that is given back is handed out again
+    assert nonces.reserve(multisigs[0]) == 2
+    nonces.rollback(multisigs[0], 2)
+
+    nonce, sig = generate_managed_nonce_and_second_signature_transfer2of3(nonces, l2.private_key, multisigs[0], a2, 10)
+    assert nonce == 2
+    tok.transfer2of3(multisigs[0], a2, 10, nonce, sig.encoded(), msg(l1))
+    nonces.confirm(multisigs[0], nonce)
+
+    # A reverted transfer (bad amount) gives its nonce back
+    nonce, sig = generate_managed_nonce_and_second_signature_transfer2of3(nonces, l2.private_key, multisigs[0], a2, 10)
+    with brownie.reverts():
+        tok.transfer2of3(multisigs[0], a2, 11, nonce, sig.encoded(), msg(l1))
+    nonces.rollback(multisigs[0], nonce)
+
+    # Rolling back a nonce below pending ones refills the gap without handing the pending ones out again
+    pending = [generate_managed_nonce_and_second_signature_transfer2of3(nonces, l2.private_key, multisigs[0], a2, 10) for _ in range(3)]
+    assert [nonce for nonce, _ in pending] == [3, 4, 5]
+    nonces.rollback(multisigs[0], 3)
+    assert nonces.resync(multisigs[0]) == 2 # Nonces 4 and 5 are still outstanding
+    nonce, sig = generate_managed_nonce_and_second_signature_transfer2of3(nonces, l2.private_key, multisigs[0], a2, 10)
+    assert nonce == 3
+    for nonce, sig in [(nonce, sig)] + pending[1:]:
+        tok.transfer2of3(multisigs[0], a2, 10, nonce, sig.encoded(), msg(l1))
+    assert nonces.resync(multisigs[0]) == 5
+    assert nonces.reserve(multisigs[0]) == 6
+
+    # Any spelling of the address shares the same nonces
+    assert nonces.reserve(multisigs[0].address.lower()) == 7
+    nonces.rollback(multisigs[0], 7)
+    assert nonces.reserve(multisigs[0].address.lower()) == 7
+
+
+def test_unordered_transfer2of3(localaccounts, deploy_multisigs):
+    a1, a2 = accounts[1:3]
+    l1, l2, l3 = localaccounts[0:3]
+
+    tok, multisigs = deploy_multisigs
+    nonces = UnorderedNonceAllocator(tok)
+
+    checkSuccessfulTransfer(tok, a1, multisigs[0], a1, xfernum, transfer_direct) # Transfer *to* multisig address (l1,l2,l3)
+
+    # Transfers signed in one order can be mined in another
+    signed = [generate_unordered_nonce_and_second_signature_transfer2of3(nonces, l2.private_key, multisigs[0], a2, 10 + i) for i in range(3)]
+    assert [nonce for nonce, _ in signed] == [0, 1, 2]
+    for i in (2, 0, 1):
+        nonce, sig = signed[i]
+        tx = tok.transfer2of3Unordered(multisigs[0], a2, 10 + i, nonce, sig.encoded(), msg(l1))
+        assert tx.events['Transfer']['value'] == 10 + i
+    assert tok.nonceBitmap(multisigs[0], 0) == 0b111
+    assert tok.nonce(multisigs[0]) == 1 # The ordered nonce is independent
+
+    # Replays fail, as do signatures for other functions
+    nonce, sig = signed[0]
+    with brownie.reverts("nonce already used"):
+        tok.transfer2of3Unordered(multisigs[0], a2, 10, nonce, sig.encoded(), msg(l1))
+    with brownie.reverts():
+        tok.transfer2of3(multisigs[0], a2, 10, 2, sig.encoded(), msg(l1))
+
+    # Clients with separate allocators use separate words; a reverted transfer (bad amount) leaves its nonce unused
+    nonce, sig = generate_unordered_nonce_and_second_signature_transfer2of3(UnorderedNonceAllocator(tok, first_word=5), l3.private_key, multisigs[0], a2, 10)
+    assert nonce == 5 * 256
+    with brownie.reverts():
+        tok.transfer2of3Unordered(multisigs[0], a2, 11, nonce, sig.encoded(), msg(l1))
+    assert tok.nonceBitmap(multisigs[0], 5) == 0
+
+    # A nonce that is given back is handed out again
+    assert nonces.reserve(multisigs[0]) == 3
+    nonces.release(multisigs[0], 3)
+
+    # Signed transfers can be cancelled before they are mined
+    nonce, sig = generate_unordered_nonce_and_second_signature_transfer2of3(nonces, l2.private_key, multisigs[0], a2, 10)
+    with brownie.reverts():
+        tok.invalidateUnorderedNonces(multisigs[0], 0, 1 << nonce, msg(a1)) # Not a key of the multisig
+    tx = tok.invalidateUnorderedNonces(multisigs[0], 0, 1 << nonce, msg(l3))
+    assert 'UnorderedNonceInvalidation' in tx.events
+    with brownie.reverts("nonce already used"):
+        tok.transfer2of3Unordered(multisigs[0], a2, 10, nonce, sig.encoded(), msg(l1))
+
+
+def test_validator_transfer2of3(localaccounts, deploy_multisigs):
+    a1, a2 = accounts[1:3]
+    l1, l2, l3, l4 = localaccounts[0:4]
+
+    tok, multisigs = deploy_multisigs
+    validator = Transfer2of3Validator(tok)
+    assert validator.add(l1, l2, l3) == multisigs[0]
+
+    checkSuccessfulTransfer(tok, a1, multisigs[0], a1, xfernum, transfer_direct) # Transfer *to* multisig address (l1,l2,l3)
+
+    nonce, sig = generate_nonce_and_second_signature_transfer2of3(tok, l2.private_key, multisigs[0], a2, 10)
+    assert validator.check(l1, multisigs[0], a2, 10, nonce, sig) == l2.address
+    with pytest.raises(ValueError, match="nonce"):
+        validator.check(l1, multisigs[0], a2, 10, nonce + 1, sig)
+    with pytest.raises(ValueError, match="sender"):
+        validator.check(l2, multisigs[0], a2, 10, nonce, sig) # Co-signer is the sender
+    with pytest.raises(ValueError, match="sender"):
+        validator.check(l4, multisigs[0], a2, 10, nonce, sig)
+    with pytest.raises(ValueError, match="co-signer"):
+        validator.check(l1, multisigs[0], a2, 11, nonce, sig) # Signature over another amount recovers another address
+    with pytest.raises(ValueError, match="unknown"):
+        validator.check(l2, multisigs[1], a2, 10, nonce, sig)
+    _, bad_sig = generate_nonce_and_second_signature_transfer2of3(tok, l4.private_key, multisigs[0], a2, 10)
+    with pytest.raises(ValueError, match="co-signer"):
+        validator.check(l1, multisigs[0], a2, 10, nonce, bad_sig)
+
+    # The same (digest, signature) pair is only recovered once
+    hits = validator.cache_info().hits
+    validator.check(l1, multisigs[0], a2, 10, nonce, sig)
+    assert validator.cache_info().hits == hits + 1
+
+    # Sending advances the cached nonce, so the signature can't be checked (or replayed) again
+    validator.transfer2of3(l1, multisigs[0], a2, 10, nonce, sig)
+    assert tok.balanceOf(a2) == 10
+    with pytest.raises(ValueError, match="nonce"):
+        validator.transfer2of3(l1, multisigs[0], a2, 10, nonce, sig)
+    nonce, sig = generate_nonce_and_second_signature_transfer2of3(tok, l3.private_key, multisigs[0], a2, 10)
+    validator.transfer2of3(l1, multisigs[0], a2, 10, nonce, sig)
+    assert tok.balanceOf(a2) == 20
+
+    # A transfer sent without the validator (e.g. by another signer) makes the cached nonce stale; it is reloaded once
+    transfer_bysig(tok, multisigs[0], a2, l2, l3.private_key, 10)
+    nonce, sig = generate_nonce_and_second_signature_transfer2of3(tok, l3.private_key, multisigs[0], a2, 10)
+    assert validator.check(l1, multisigs[0], a2, 10, nonce, sig) == l3.address
+    with pytest.raises(ValueError, match="nonce"):
+        validator.check(l1, multisigs[0], a2, 10, nonce - 1, sig)
+
+
+def test_local_multisig_addresses(localaccounts, deploy_multisigs, tmp_path):
+    a1, a2 = accounts[1:3]
+    l1, l2, l3 = localaccounts[0:3]
+
+    tok, multisigs = deploy_multisigs
+    triples = [localaccounts[i:i+3] for i in range(len(localaccounts) - 2)]
+    assert multisig_address(l1, l2, l3) == tok.getMultisigAddress(l1, l2, l3) == multisigs[0]
+    assert multisig_addresses_of(triples) == multisigs
+    assert multisig_addresses_of(triples, checksum=False)[1] == bytes.fromhex(multisigs[1].address[2:])
+
+    # The directory maps the addresses back to their keys, also after it is reopened
+    with MultisigDirectory(str(tmp_path / 'multisigs')) as directory:
+        assert directory.add_many(triples) == multisigs
+    with MultisigDirectory(str(tmp_path / 'multisigs')) as directory:
+        assert len(directory) == len(multisigs)
+        assert directory.keys_of(multisigs[0]) == (l1.address, l2.address, l3.address)
+        assert a1 not in directory
+        with pytest.raises(KeyError):
+            directory.keys_of(a1)
+
+        # ... and lets the validator check multisigs it was not told about
+        checkSuccessfulTransfer(tok, a1, multisigs[0], a1, xfernum, transfer_direct) # Transfer *to* multisig address (l1,l2,l3)
+        validator = Transfer2of3Validator(tok, directory=directory)
+        nonce, sig = generate_nonce_and_second_signature_transfer2of3(tok, l3.private_key, multisigs[0], a2, 10)
+        validator.transfer2of3(l1, multisigs[0], a2, 10, nonce, sig)
+        assert tok.balanceOf(a2) == 10
+
+
+def test_transfer2of3_digest(localaccounts, deploy_multisigs):
+    a2, a3 = accounts[2:4]
+    tok, multisigs = deploy_multisigs
+
+    def expected_digest(spender, amount, nonce):
+        return Web3.solidityKeccak(['address', 'address', 'address', 'uint256', 'uint256'],
+                                   [tok.address, spender.address, multisigs[0].address, amount, nonce])
+
+    template = Transfer2of3Digest(tok, multisigs[0])
+    legs = [(a2, 1, 2), (a3, xfernum, 3), (a2, 2**256 - 1, 2**64)]
+
+    for spender, amount, nonce in legs:
+        assert template.digest(spender, amount, nonce) == expected_digest(spender, amount, nonce)
+    assert template.digest_many(legs) == [expected_digest(*leg) for leg in legs]
+
+
+def test_batch_transfer2of3(localaccounts, deploy_multisigs):
+    a1, a2, a3 = accounts[1:4]
+    l1, l2, l3 = localaccounts[0:3]
+
+    tok, multisigs = deploy_multisigs
+
+    checkSuccessfulTransfer(tok, a1, multisigs[0], a1, xfernum, transfer_direct) # Transfer *to* multisig address (l1,l2,l3)
+
+    legs = [(a2, 10), (a3, 20), (multisigs[1], 30)]
+    recipients, amounts = [leg[0] for leg in legs], [leg[1] for leg in legs]
+    nonce, sig = generate_nonce_and_second_signature_transfer2of3_batch(tok, l2.private_key, multisigs[0], legs)
+
+    # The signature covers every leg
+    with brownie.reverts():
+        tok.transfer2of3Batch(multisigs[0], recipients, [10, 20, 31], nonce, sig.encoded(), msg(l1))
+    with brownie.reverts():
+        tok.transfer2of3Batch(multisigs[0], [a3, a2, multisigs[1]], amounts, nonce, sig.encoded(), msg(l1))
+
+    tx = tok.transfer2of3Batch(multisigs[0], recipients, amounts, nonce, sig.encoded(), msg(l1))
+    assert [e['value'] for e in tx.events['Transfer']] == amounts
+    assert tok.balanceOf(multisigs[0]) == xfernum - 60
+    assert tok.balanceOf(multisigs[1]) == 30
+    assert tok.nonce(multisigs[0]) == nonce
+
+    # Replaying the batch fails
+    with brownie.reverts():
+        tok.transfer2of3Batch(multisigs[0], recipients, amounts, nonce, sig.encoded(), msg(l1))
+
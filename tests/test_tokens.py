@@ -1,10 +1,13 @@
 from re import A
 import pytest
 import brownie
-from brownie import RUToken, accounts
+from brownie import RUToken, accounts, chain
 from brownie.test import given, strategy
 from hypothesis import settings
 from hypothesis.strategies import sampled_from
+from scripts.token_views import balances_of, allowances_of, nonces_of
+from scripts.permit import domain_separator, permit_args, sign_permit, PERMIT_VERSION
+from eth_keys.constants import SECPK1_N as SECP256K1_N
 
 
 
@@ -62,6 +65,11 @@ class GenericTokenTest:
     def mint_funds(self, tok, account, amount):
         return None
 
+    # Returns a token without balances for a hypothesis example, or None to deploy one with `deploy_tok`.
+    # Subclasses may return one from a session world (see tests/conftest.py) instead of deploying a token per example.
+    def example_tok(self):
+        return None
+
     # def deploy_tok(self, price: int, maxtok: int) -> RUToken:
     #     return self.tokenType().deploy
 
@@ -70,11 +78,12 @@ class GenericTokenTest:
     #     tok = self.deploy_tok(price, maxtok)
     #     tx = tok.mint(msg(mintaccount, amount=price*mintamount))
     #     return tok
-    def deploy_and_mint(self, mintamount: int, mintaccount, tokaccount = None):
-        if tokaccount is None:
-            tokaccount = accounts.add()
-            accounts[0].transfer(tokaccount, 1e10) # Give an initial balance
-        tok = self.deploy_tok(tokaccount)
+    def deploy_and_mint(self, mintamount: int, mintaccount, tokaccount = None, tok = None):
+        if tok is None:
+            if tokaccount is None:
+                tokaccount = accounts.add()
+                accounts[0].transfer(tokaccount, 1e10) # Give an initial balance
+            tok = self.deploy_tok(tokaccount)
         tx = self.mint_funds(tok, mintaccount, mintamount)
         assert tok.balanceOf(mintaccount) == mintamount
         return tok
@@ -87,13 +96,13 @@ class GenericTokenTest:
 
 
 
-    def simple_transfer_testbody(self, txnum: int, extranum: int, a1, a2):
+    def simple_transfer_testbody(self, txnum: int, extranum: int, a1, a2, tok = None):
         totalmint = txnum + extranum
 
         # if a1 == a2:
         #     return # Transfer must be between different accounts.
 
-        tok = self.deploy_and_mint(totalmint, a1)
+        tok = self.deploy_and_mint(totalmint, a1, tok=tok)
         checkSuccessfulTransfer(tok, a1, a2, a1, txnum, transfer_direct)
 
 
@@ -106,7 +115,7 @@ class GenericTokenTest:
     )
     @settings(max_examples=15)
     def test_simple_transfer(self, txnum, extranum, a1, a2):
-        self.simple_transfer_testbody(txnum, extranum, a1, a2)
+        self.simple_transfer_testbody(txnum, extranum, a1, a2, self.example_tok())
 
     # Test successful zero transfer between two accounts.
     def test_zero_transfer(self):
@@ -225,10 +234,15 @@ class GenericTokenTest:
         checkFailedTransfer(tok, a1, a3, a2, approveamount, transfer_byproxy)
 
 
+# Prices and supply cap of the `empty_ru_tokens` world (see tests/conftest.py)
+world_prices = (100, 3, 22)
+world_maxtok = 1000
+
 @pytest.fixture(autouse=True, scope='class')
-def default_setup(request):
+def default_setup(request, empty_ru_tokens):
     request.cls.price = 100
     request.cls.maxtok = 1000
+    request.cls.empty_tokens = empty_ru_tokens # Deployed once per session; used by the hypothesis tests
 
 
 def deploy_ru_token(price, maxtok, account):
@@ -250,6 +264,10 @@ class TestRUToken(GenericTokenTest):
     def mint_funds(self, tok: RUToken, account, amount):
         return mint_ru_tokens(tok, account, amount)
 
+    # The hypothesis tests that draw the supply cap, or a price outside `world_prices`, still deploy a token per example.
+    def example_tok(self):
+        return self.empty_tokens[self.price]
+
 
     # Test mint-burn sequence from single address
     @given(
@@ -298,9 +316,23 @@ class TestRUToken(GenericTokenTest):
             tx2 = tok.burn(maxtok + 1, msg(a1))
 
 
+    # Burned tokens leave the supply; they are not credited to the zero address.
+    def test_burn_zero_address_balance(self):
+        a1 = accounts[1]
+        zero = '0x' + '00' * 20
+
+        tok = self.deploy_and_mint(10, a1)
+        tx = tok.burn(4, msg(a1))
+
+        assert tok.balances(zero) == 0
+        assert tok.totalSupply() == 6
+        assert tx.events['Transfer']['to'] == zero
+        assert tx.events['Transfer']['value'] == 4
+
+
     # Test mint-transfer-burn sequence.
     @given(
-        price=sampled_from([100, 3, 22]),
+        price=sampled_from(world_prices),
         txnum=strategy('uint', min_value=1, max_value=100),
         extranum=strategy('uint', min_value=0, max_value=100),
     )
@@ -317,7 +349,7 @@ class TestRUToken(GenericTokenTest):
         if a1 == a2:
             return # Transfer must be between different accounts.
 
-        tok = self.deploy_tok(accounts[0])
+        tok = self.example_tok()
         tx1 = self.mint_funds(tok, a1, totalmint)
         checkSuccessfulTransfer(tok, a1, a2, a1, txnum, transfer_direct)
 
@@ -391,3 +423,117 @@ class TestRUToken(GenericTokenTest):
         with brownie.reverts():
             tx = self.mint_funds(tok, to2, 1)
 
+    # Check that the bulk view helpers match the single-address views
+    def test_bulk_views(self):
+        a1, a2, a3, a4 = accounts[1:5]
+
+        tok = self.deploy_tok(accounts[0])
+        self.mint_funds(tok, a1, 100)
+        self.mint_funds(tok, a2, 20)
+        tok.approve(a2, 30, msg(a1))
+        tok.approve(a3, 40, msg(a2))
+        multisig = tok.registerMultisigAddress(a1, a2, a3).return_value
+
+        assert balances_of(tok, [a1, a2, a3, a1, a4], chunk_size=2) == [100, 20, 0, 100, 0]
+        tok.burn(10, msg(a1))
+        assert balances_of(tok, [a1, '0x' + '00' * 20]) == [90, 0] # The zero address doesn't make the batch revert
+        assert allowances_of(tok, [(a1, a2), (a2, a3), (a3, a1)], chunk_size=2) == [30, 40, 0]
+        assert nonces_of(tok, [multisig, a4], chunk_size=2) == [1, 0]
+
+    # Test a batch transfer to several accounts, directly and through an allowance
+    def test_batch_transfer(self):
+        a1, a2, a3, a4 = accounts[1:5]
+
+        tok = self.deploy_tok(accounts[0])
+        self.mint_funds(tok, a1, 100)
+
+        tx = tok.batchTransfer([a2, a3, a2], [10, 20, 5], msg(a1))
+        assert [(e['to'], e['value']) for e in tx.events['Transfer']] == [(a2.address, 10), (a3.address, 20), (a2.address, 5)]
+        assert (tok.balanceOf(a1), tok.balanceOf(a2), tok.balanceOf(a3)) == (65, 15, 20)
+
+        tok.approve(a4, 50, msg(a1))
+        tok.batchTransferFrom(a1, [a2, a3], [30, 20], msg(a4))
+        assert (tok.balanceOf(a1), tok.balanceOf(a2), tok.balanceOf(a3)) == (15, 45, 40)
+        assert tok.allowance(a1, a4) == 0
+
+        # The whole batch reverts if the total is too large
+        with brownie.reverts():
+            tok.batchTransfer([a2, a3], [10, 6], msg(a1))
+        with brownie.reverts():
+            tok.batchTransfer([a2, a3], [10], msg(a1))
+        assert tok.balanceOf(a1) == 15
+
+    def test_infinite_allowance(self):
+        a1, a2, a3 = accounts[1:4]
+        infinite = 2**256 - 1
+
+        tok = self.deploy_tok(accounts[0])
+        self.mint_funds(tok, a1, 100)
+
+        tok.approve(a2, infinite, msg(a1))
+        tok.transferFrom(a1, a3, 30, msg(a2))
+        tok.batchTransferFrom(a1, [a2, a3], [10, 20], msg(a2))
+        assert tok.allowance(a1, a2) == infinite
+        assert (tok.balanceOf(a1), tok.balanceOf(a2), tok.balanceOf(a3)) == (40, 10, 50)
+
+        # The balance is still checked
+        with brownie.reverts():
+            tok.transferFrom(a1, a3, 41, msg(a2))
+
+        # A finite allowance is still debited, and can't be exceeded
+        tok.approve(a2, 5, msg(a1))
+        tok.transferFrom(a1, a3, 5, msg(a2))
+        assert tok.allowance(a1, a2) == 0
+        with brownie.reverts():
+            tok.transferFrom(a1, a3, 1, msg(a2))
+
+    # Compare the gas of one batchTransfer against the same transfers sent one at a time
+    def test_batch_transfer_gas(self):
+        a1 = accounts[1]
+        recipients = accounts[2:10]
+        amounts = [5] * len(recipients)
+
+        single_tok = self.deploy_tok(accounts[0])
+        self.mint_funds(single_tok, a1, sum(amounts))
+        single_gas = sum(single_tok.transfer(r, amount, msg(a1)).gas_used for r, amount in zip(recipients, amounts))
+
+        batch_tok = self.deploy_tok(accounts[0])
+        self.mint_funds(batch_tok, a1, sum(amounts))
+        batch_gas = batch_tok.batchTransfer(recipients, amounts, msg(a1)).gas_used
+
+        assert batch_gas < single_gas
+
+
+    # Test EIP-2612 permits: a signed approval can be submitted by anyone, once, before its deadline.
+    def test_permit(self, localaccounts):
+        owner = localaccounts[0]
+        a1, a2 = accounts[1:3]
+        tok = self.deploy_tok(accounts[0])
+        self.mint_funds(tok, a1, 100)
+        tok.transfer(owner, 100, msg(a1))
+
+        assert tok.DOMAIN_SEPARATOR() == domain_separator(tok.name(), PERMIT_VERSION, chain.id, tok)
+        deadline = chain.time() + 3600
+        sig = sign_permit(tok, owner.private_key, a2, 60, deadline)
+        tx = tok.permit(owner, a2, 60, deadline, *permit_args(sig), msg(a1))
+        assert tx.events['Approval']['value'] == 60
+        assert tok.allowance(owner, a2) == 60
+        assert tok.nonces(owner) == 1
+        checkSuccessfulTransfer(tok, owner, a1, a2, 60, transfer_byproxy)
+
+        with brownie.reverts(): # Replay
+            tok.permit(owner, a2, 60, deadline, *permit_args(sig), msg(a1))
+        with brownie.reverts(): # Signed by someone else
+            tok.permit(owner, a2, 60, deadline, *permit_args(sign_permit(tok, localaccounts[1].private_key, a2, 60, deadline)), msg(a1))
+        with brownie.reverts(): # Different value than signed
+            tok.permit(owner, a2, 61, deadline, *permit_args(sign_permit(tok, owner.private_key, a2, 60, deadline)), msg(a1))
+
+        # The malleable twin of a valid signature (v flipped, s replaced by n - s) recovers the owner too, but is rejected
+        v, r, s = permit_args(sign_permit(tok, owner.private_key, a2, 60, deadline))
+        high_s = SECP256K1_N - int.from_bytes(s, 'big')
+        with brownie.reverts("invalid permit signature s value"):
+            tok.permit(owner, a2, 60, deadline, 55 - v, r, high_s.to_bytes(32, 'big'), msg(a1))
+
+        expired = chain.time() - 1
+        with brownie.reverts("permit expired"):
+            tok.permit(owner, a2, 10, expired, *permit_args(sign_permit(tok, owner.private_key, a2, 10, expired)), msg(a1))